@@ -0,0 +1,225 @@
+"""Benchmarks for command discovery, tokenizing, parsing, help text and dispatch.
+
+Each command count runs in its own process with a generated module of Command subclasses,
+so the classes of one size do not leak into another.  Results are written as JSON and can be
+compared with an earlier run:
+
+    python -m benchmarks.bench --sizes 100 1000 --output results.json
+    python -m benchmarks.bench --sizes 100 1000 --compare results.json
+"""
+
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import SUPPRESS, ArgumentParser
+from os import path
+
+COMMAND_TEMPLATE = """
+class Command{index}(Command):
+{key}
+    parser = ArgumentParser(prog="command-{index}", description="Benchmark command {index}.")
+    parser.add_argument("--flag", action="store_true")
+    parser.add_argument("--value", type=int)
+    parser.add_argument("items", nargs="*")
+"""
+
+# Key implementations cycled through by the generated commands.
+KEY_TEMPLATES = [
+    '    key = "command-{index}"\n    short_key = "c{index}"',
+    '    @classmethod\n    def key(cls):\n        return "command-{index}"',
+    '    @staticmethod\n    def key():\n        return "command-{index}"\n\n'
+    '    @staticmethod\n    def alt_key():\n        return "alt-{index}"',
+]
+
+
+def write_commands_module(directory, size):
+    """Writes a module with `size` Command subclasses and returns its name."""
+    lines = ["from argparse import ArgumentParser", "from ccli import Command"]
+    for index in range(size):
+        key = KEY_TEMPLATES[index % len(KEY_TEMPLATES)].format(index=index)
+        lines.append(COMMAND_TEMPLATE.format(index=index, key=key))
+
+    module_name = "bench_commands_%d" % size
+    with open(path.join(directory, module_name + ".py"), "w", encoding="utf8") as f:
+        f.write("\n".join(lines))
+    return module_name
+
+
+def chain_args(size, length):
+    """Returns a command chain of about `length` arguments spread over the commands."""
+    args = []
+    index = 0
+    while len(args) < length:
+        args += ["command-%d" % (index % size), "--flag", "--value", "1", "a", "b"]
+        index += 1
+    return args
+
+
+def measure(function, repeat):
+    """Returns the run times of a function in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_worker(size, repeat, chain_length):
+    """Measures every benchmark for one command count and prints the results as JSON."""
+    directory = tempfile.mkdtemp(prefix="ccli-bench-")
+    try:
+        results = measure_all(directory, size, repeat, chain_length)
+    finally:
+        shutil.rmtree(directory)
+    json.dump(results, sys.stdout)
+
+
+def measure_all(directory, size, repeat, chain_length):
+    module_name = write_commands_module(directory, size)
+    sys.path.insert(0, directory)
+
+    from ccli import CCLI
+
+    results = {}
+    start = time.perf_counter()
+    __import__(module_name)
+    results["import_commands"] = [time.perf_counter() - start]
+
+    cli = CCLI(name="Benchmark", auto_run=False)
+    args = ["bench"] + chain_args(size, chain_length)
+
+    def build_command_map():
+        cli.available_commands = {}
+        cli._build_command_map()
+
+    def build_invoked_commands():
+        cli._prepare(args)
+        cli._build_invoked_commands()
+
+    def instantiate_commands():
+        cli._prepare(args)
+        cli._build_invoked_commands()
+        cli._instantiate_commands()
+
+    results["build_command_map"] = measure(build_command_map, repeat)
+    results["build_invoked_commands"] = measure(build_invoked_commands, repeat)
+    results["instantiate_commands"] = measure(instantiate_commands, repeat)
+    results["make_help_text"] = measure(
+        lambda: cli._build_help_parser().format_help(), repeat
+    )
+    results["dispatch"] = measure(lambda: cli.dispatch(args[1:]), repeat)
+
+    cold_start_code = (
+        "import %s; from ccli import CCLI; CCLI(name='Benchmark', cli_args=%r)"
+        % (module_name, args)
+    )
+    env_path = path.pathsep.join([directory, path.abspath(".")])
+    results["cold_start"] = measure(
+        lambda: subprocess.run(
+            [sys.executable, "-c", cold_start_code],
+            check=True,
+            env={"PYTHONPATH": env_path},
+        ),
+        max(1, repeat // 5),
+    )
+    return results
+
+
+def summarize(size, times):
+    return {
+        "size": size,
+        "min": min(times),
+        "median": statistics.median(times),
+        "repeat": len(times),
+    }
+
+
+def run(sizes, repeat, chain_length):
+    """Runs a worker process per command count and returns the collected results."""
+    from ccli import __version__
+
+    benchmarks = {}
+    for size in sizes:
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench",
+                "--worker",
+                str(size),
+                "--repeat",
+                str(repeat),
+                "--chain-length",
+                str(chain_length),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        for name, times in json.loads(process.stdout).items():
+            benchmarks.setdefault(name, []).append(summarize(size, times))
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "ccli": __version__,
+        "chain_length": chain_length,
+        "benchmarks": benchmarks,
+    }
+
+
+def print_results(results, baseline=None):
+    """Prints the median of each benchmark and its ratio to a baseline run."""
+    baseline_medians = {}
+    if baseline is not None:
+        for name, runs in baseline["benchmarks"].items():
+            for run_result in runs:
+                baseline_medians[name, run_result["size"]] = run_result["median"]
+
+    for name, runs in results["benchmarks"].items():
+        for run_result in runs:
+            line = "%-24s %6d commands  %10.3f ms" % (
+                name,
+                run_result["size"],
+                run_result["median"] * 1000,
+            )
+            previous = baseline_medians.get((name, run_result["size"]))
+            if previous:
+                line += "  %5.2fx baseline" % (run_result["median"] / previous)
+            print(line)
+
+
+def main():
+    parser = ArgumentParser(description="CCLI benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--chain-length", type=int, default=1000)
+    parser.add_argument("--output", help="Write the results to a JSON file.")
+    parser.add_argument("--compare", help="JSON results of an earlier run.")
+    parser.add_argument("--worker", type=int, help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.repeat, args.chain_length)
+        return
+
+    results = run(args.sizes, args.repeat, args.chain_length)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,35 @@
+from ccli.arguments import Argument
 from ccli.ccli import CCLI
 from ccli.command import Command
+from ccli.context import ChainContext
+from ccli.dispatchresult import DispatchResult
+from ccli.instrument import InstrumentationHook
+from ccli.policy import ExecutionPolicy
+from ccli.registry import CommandRegistry
 
 __version__ = "1.1.0"
 
+# Exports imported on first use, keeping their dependencies out of the startup path.
+_LAZY_EXPORTS = {"Profiler": "ccli.profiler", "ResultCache": "ccli.cache"}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+
+        return getattr(import_module(_LAZY_EXPORTS[name]), name)
+    raise AttributeError("module 'ccli' has no attribute '%s'" % name)
+
+
 __all__ = [
+    "Argument",
     "CCLI",
+    "ChainContext",
     "Command",
+    "CommandRegistry",
+    "DispatchResult",
+    "ExecutionPolicy",
+    "InstrumentationHook",
+    "Profiler",
+    "ResultCache",
 ]
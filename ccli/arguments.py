@@ -0,0 +1,298 @@
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+
+# Actions supported by `Argument`, all of which have a fast path in `CompiledParser`.
+ACTIONS = ("store", "store_true", "store_false", "append", "count")
+# Numbers of values a positional argument may take, besides an exact count.
+VARIABLE_NARGS = ("?", "*", "+")
+
+
+class Argument:
+    """Declaration of a command argument, with the same meaning as `add_argument`.
+
+    class SeedDatabase(Command):
+        key = "seed"
+        arguments = (
+            Argument("sql_file", nargs="+"),
+            Argument("--table", "-t", choices=["users", "orders"]),
+            Argument("--verbose", "-v", action="count"),
+        )
+    """
+
+    def __init__(
+        self,
+        *names,
+        action="store",
+        nargs=None,
+        type=None,
+        default=None,
+        choices=None,
+        required=False,
+        help=None,
+        metavar=None,
+        dest=None,
+    ):
+        """Declares an argument.
+
+        Args:
+            names: Name of a positional argument, or the option strings of an option.
+            action: One of "store", "store_true", "store_false", "append" or "count".
+            nargs: Number of values of a positional argument: an int, "?", "*" or "+".
+            type: Callable converting each value.
+            default: Value used when the argument is not given.
+            choices: Allowed values, after conversion.
+            required: Whether an option must be given.
+            help: Help text of the argument.
+            metavar: Name of the argument's values in help text.
+            dest: Attribute name on the parsed namespace.  Defaults to the name of a positional
+              or the first long option string.
+        """
+        if not names:
+            raise ValueError("An argument needs a name or option strings")
+        if action not in ACTIONS:
+            raise ValueError(
+                "Unsupported action '%s', expected one of %s"
+                % (action, ", ".join(ACTIONS))
+            )
+
+        self.option_strings = [name for name in names if name.startswith("-")]
+        if self.option_strings and len(self.option_strings) != len(names):
+            raise ValueError("Cannot mix positional and option names: %s" % (names,))
+        if len(names) > 1 and not self.option_strings:
+            raise ValueError("A positional argument has a single name: %s" % (names,))
+        if self.option_strings and nargs is not None:
+            raise ValueError("nargs is only supported for positional arguments")
+        if not self.option_strings and action != "store":
+            raise ValueError("Positional arguments only support the store action")
+
+        if dest is None:
+            if self.option_strings:
+                long_options = [o for o in self.option_strings if o.startswith("--")]
+                dest = (long_options or self.option_strings)[0].lstrip("-")
+                dest = dest.replace("-", "_")
+            else:
+                dest = names[0]
+        if action == "store_true" and default is None:
+            default = False
+        elif action == "store_false" and default is None:
+            default = True
+
+        self.names = names
+        self.action = action
+        self.nargs = nargs
+        self.type = type
+        self.default = default
+        self.choices = choices
+        self.required = required
+        self.help = help
+        self.metavar = metavar
+        self.dest = dest
+
+    def add_to(self, parser):
+        """Adds the argument to an argparse parser."""
+        kwargs = {"action": self.action, "default": self.default, "help": self.help}
+        if self.option_strings:
+            kwargs["dest"] = self.dest
+            kwargs["required"] = self.required
+        if self.action in ("store", "append"):
+            kwargs.update(
+                nargs=self.nargs,
+                type=self.type,
+                choices=self.choices,
+                metavar=self.metavar,
+            )
+        parser.add_argument(*self.names, **kwargs)
+
+    def __repr__(self):
+        return "Argument(%s, action=%s)" % (", ".join(self.names), self.action)
+
+
+class CompiledParser:
+    """Parser for declared arguments built around lookup tables.
+
+    Common command lines are parsed with a single pass over the arguments.  Anything else,
+    including help flags, abbreviated or combined options and invalid values, is passed to
+    an equivalent argparse parser so errors and help text are exactly those of argparse.
+    """
+
+    def __init__(self, arguments, prog=None, description=None):
+        """Compiles argument declarations.
+
+        Args:
+            arguments: Iterable of `Argument`s.
+            prog: Program name shown in help text and errors.
+            description: Description shown in help text.
+        """
+        self.arguments = list(arguments)
+        self.prog = prog
+        self.description = description
+        self.options = {}
+        self.positionals = []
+        for argument in self.arguments:
+            if argument.option_strings:
+                for option in argument.option_strings:
+                    self.options[option] = argument
+            else:
+                self.positionals.append(argument)
+        self.required = [a for a in self.arguments if a.option_strings and a.required]
+
+        self.variable = [a for a in self.positionals if a.nargs in VARIABLE_NARGS]
+        self.fixed_count = sum(
+            1 if a.nargs is None else a.nargs
+            for a in self.positionals
+            if a not in self.variable
+        )
+        self._parser = None
+
+    @property
+    def parser(self):
+        """Equivalent argparse parser, built on first use."""
+        if self._parser is None:
+            parser = ArgumentParser(prog=self.prog, description=self.description)
+            for argument in self.arguments:
+                argument.add_to(parser)
+            self._parser = parser
+        return self._parser
+
+    def parse_args(self, args):
+        """Parses a list of arguments into an `argparse.Namespace`."""
+        namespace = self._parse(args)
+        if namespace is None:
+            return self.parser.parse_args(args)
+        return namespace
+
+    def _parse(self, args):
+        """Returns the parsed namespace, or None if argparse must parse the arguments."""
+        if len(self.variable) > 1:
+            return None
+
+        values = {}
+        positional_values = []
+        option_seen = False
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            i += 1
+            if not arg.startswith("-") or arg == "-":
+                # argparse matches positionals separately on each side of an option.
+                if option_seen and (self.variable or positional_values):
+                    return None
+                positional_values.append(arg)
+                continue
+
+            option_seen = True
+            option, equals, value = arg.partition("=")
+            argument = self.options.get(option)
+            if argument is None:
+                return None
+
+            if argument.action in ("store_true", "store_false", "count"):
+                if equals:
+                    return None
+                if argument.action == "count":
+                    count = values.get(argument.dest, argument.default)
+                    values[argument.dest] = (count or 0) + 1
+                else:
+                    values[argument.dest] = argument.action == "store_true"
+                continue
+
+            if not equals:
+                if i == len(args) or args[i].startswith("-"):
+                    return None
+                value = args[i]
+                i += 1
+            try:
+                value = self._convert(argument, value)
+            except ValueError:
+                return None
+            if argument.action == "append":
+                if argument.dest not in values:
+                    values[argument.dest] = list(argument.default or [])
+                values[argument.dest].append(value)
+            else:
+                values[argument.dest] = value
+
+        if any(argument.dest not in values for argument in self.required):
+            return None
+        if not self._assign_positionals(positional_values, values):
+            return None
+
+        namespace = Namespace()
+        for argument in self.arguments:
+            if argument.dest in values:
+                value = values[argument.dest]
+            elif argument.action == "append":
+                value = None if argument.default is None else list(argument.default)
+            elif (
+                argument.option_strings
+                and isinstance(argument.default, str)
+                and argument.type is not None
+            ):
+                try:
+                    value = argument.type(argument.default)
+                except (ValueError, TypeError, ArgumentTypeError):
+                    return None
+            else:
+                value = argument.default
+            setattr(namespace, argument.dest, value)
+        return namespace
+
+    def _assign_positionals(self, positional_values, values):
+        """Assigns positional values to the positional arguments, as argparse would."""
+        extra = len(positional_values) - self.fixed_count
+        if extra < 0:
+            return False
+        if self.variable:
+            nargs = self.variable[0].nargs
+            if (nargs == "?" and extra > 1) or (nargs == "+" and extra < 1):
+                return False
+        elif extra:
+            return False
+
+        start = 0
+        for argument in self.positionals:
+            if argument.nargs is None:
+                count = 1
+            elif argument in self.variable:
+                count = extra
+            else:
+                count = argument.nargs
+            strings = positional_values[start : start + count]
+            start += count
+
+            if argument.nargs == "?" and not strings:
+                if isinstance(argument.default, str):
+                    try:
+                        values[argument.dest] = self._convert(
+                            argument, argument.default
+                        )
+                    except ValueError:
+                        return False
+                continue
+            if argument.nargs == "*" and not strings:
+                if argument.choices is not None:
+                    return False
+                if argument.default is None:
+                    values[argument.dest] = []
+                continue
+
+            try:
+                converted = [self._convert(argument, string) for string in strings]
+            except ValueError:
+                return False
+            if argument.nargs is None or argument.nargs == "?":
+                converted = converted[0]
+            values[argument.dest] = converted
+        return True
+
+    @staticmethod
+    def _convert(argument, string):
+        """Converts a value and checks its choices, raising ValueError when it is invalid."""
+        value = string
+        if argument.type is not None:
+            try:
+                value = argument.type(string)
+            except (TypeError, ArgumentTypeError) as e:
+                raise ValueError(e)
+        if argument.choices is not None and value not in argument.choices:
+            raise ValueError("Invalid choice: %r" % (value,))
+        return value
@@ -0,0 +1,89 @@
+import json
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchResult:
+    """Result of one command line of a batch."""
+
+    def __init__(self, line_number, args, result):
+        self.line_number = line_number
+        self.args = args
+        self.result = result
+
+    def __repr__(self):
+        return "BatchResult(line=%s, exit_code=%s, args=%s)" % (
+            self.line_number,
+            self.result.exit_code,
+            self.args,
+        )
+
+
+def read_batch(stream, json_lines=False):
+    """Reads command lines from a text stream.
+
+    Blank lines and lines starting with `#` are ignored.
+
+    Args:
+        stream: Text stream with one command line per line.
+        json_lines: Read each line as JSON, either a list of arguments or an object with an
+          `args` list.  Otherwise lines are split like a shell would.
+
+    Yields:
+        The line number and the list of arguments of each command line.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if json_lines:
+            args = json.loads(line)
+            if isinstance(args, dict):
+                args = args["args"]
+        else:
+            args = shlex.split(line)
+        yield line_number, [str(arg) for arg in args]
+
+
+def run_batch(cli, lines, max_workers=None):
+    """Dispatches command lines through one CCLI.
+
+    Args:
+        cli: CCLI to dispatch the command lines with.
+        lines: Iterable of line numbers and arguments, as created by `read_batch`.
+        max_workers: Run up to this many command lines at the same time.
+          Defaults to running them one after another.
+
+    Returns:
+        A `BatchResult` for each line, in input order.
+    """
+
+    def dispatch(line):
+        line_number, args = line
+        return BatchResult(line_number, args, cli.dispatch(args))
+
+    if max_workers is None or max_workers <= 1:
+        return [dispatch(line) for line in lines]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(dispatch, lines))
+
+
+def format_report(results):
+    """Returns a report with the exit code of each line and a summary."""
+    report = []
+    for batch_result in results:
+        line = "line %d: exit %d: %s" % (
+            batch_result.line_number,
+            batch_result.result.exit_code,
+            shlex.join(batch_result.args),
+        )
+        error = batch_result.result.error
+        if error is not None and not isinstance(error, SystemExit):
+            line += " (%s: %s)" % (type(error).__name__, error)
+        report.append(line)
+
+    failed = sum(1 for batch_result in results if not batch_result.result.ok)
+    report.append("%d command lines, %d failed" % (len(results), failed))
+    return "\n".join(report)
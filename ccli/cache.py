@@ -0,0 +1,292 @@
+import json
+import pickle
+import sys
+import time
+from collections import defaultdict
+from hashlib import sha1, sha256
+from inspect import isgenerator
+from os import environ, getpid, listdir, makedirs, path, remove, replace, stat, utime
+
+from .registry import CommandRegistry
+
+
+def default_cache_dir():
+    """Returns the CCLI cache directory, following the XDG base directory specification."""
+    base = environ.get("XDG_CACHE_HOME") or path.join(path.expanduser("~"), ".cache")
+    return path.join(base, "ccli")
+
+
+class CommandIndexCache:
+    """On-disk cache of the command index.
+
+    The index records every command's keys, import path and description along with the
+    modification time and size of the modules the commands were loaded from and of the
+    script that was run, which imports the command modules.
+    The cache is ignored as soon as one of those files changes.
+    """
+
+    VERSION = 2
+
+    def __init__(self, name, directory=None):
+        """Creates a cache for a CLI.
+
+        Args:
+            name: Name of the command line interface.
+            directory: Cache directory.  Defaults to `default_cache_dir()`.
+        """
+        if directory is None:
+            directory = default_cache_dir()
+        # Different scripts may share a CLI name, so the script path is part of the file name.
+        script = path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else ""
+        digest = sha1(("%s\0%s" % (name, script)).encode("utf8")).hexdigest()
+        self.path = path.join(directory, "index-%s.json" % digest)
+
+    def load(self):
+        """Returns a `CommandRegistry` for the cached index, or None if it is missing or stale."""
+        index = self._load_index()
+        if index is None:
+            return None
+        return CommandRegistry.from_manifest(index)
+
+    def load_extra(self, name):
+        """Returns data stored with the index by `save`, or None if it is missing or stale."""
+        index = self._load_index()
+        if index is None:
+            return None
+        return index["extras"].get(name)
+
+    def _load_index(self):
+        try:
+            with open(self.path, encoding="utf8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if index.get("version") != CommandIndexCache.VERSION:
+            return None
+        for file_path, fingerprint in index["modules"].items():
+            if self._fingerprint(file_path) != fingerprint:
+                return None
+        return index
+
+    def save(self, available_commands, **extras):
+        """Writes the index of the available commands to disk.
+
+        Nothing is written if a command was not loaded from a module file, because the
+        index could not be invalidated when it changes.
+
+        Args:
+            available_commands: Map of command keys to command classes.
+            extras: JSON serializable data stored with the index, such as the completion
+              index or rendered help text.
+        """
+        keys_by_class = defaultdict(list)
+        for key, command_class in available_commands.items():
+            keys_by_class[command_class].append(key)
+
+        commands = []
+        modules = {
+            file_path: self._fingerprint(file_path) for file_path in self._entry_files()
+        }
+        for command_class, keys in keys_by_class.items():
+            file_path = getattr(
+                sys.modules.get(command_class.__module__), "__file__", None
+            )
+            if file_path is None or "<" in command_class.__qualname__:
+                return
+            file_path = path.abspath(file_path)
+            modules[file_path] = self._fingerprint(file_path)
+
+            description = command_class.description
+            if command_class.parser is not None:
+                description = command_class.parser.description
+            commands.append(
+                {
+                    "target": "%s:%s"
+                    % (command_class.__module__, command_class.__qualname__),
+                    "keys": keys,
+                    "description": description,
+                }
+            )
+
+        index = {
+            "version": CommandIndexCache.VERSION,
+            "modules": modules,
+            "commands": commands,
+            "extras": extras,
+        }
+        try:
+            makedirs(path.dirname(self.path), exist_ok=True)
+            temp_path = "%s.%d.tmp" % (self.path, getpid())
+            with open(temp_path, "w", encoding="utf8") as f:
+                json.dump(index, f)
+            replace(temp_path, self.path)
+        except OSError:
+            # Caching is an optimization, a read only file system should not stop the CLI.
+            pass
+
+    @staticmethod
+    def _entry_files():
+        """Returns the script and main module that were run, whose imports decide which
+        command modules are loaded."""
+        files = set()
+        if sys.argv and sys.argv[0] and path.isfile(sys.argv[0]):
+            files.add(path.abspath(sys.argv[0]))
+        main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+        if main_file and path.isfile(main_file):
+            files.add(path.abspath(main_file))
+        return files
+
+    @staticmethod
+    def _fingerprint(file_path):
+        try:
+            file_stat = stat(file_path)
+        except OSError:
+            return None
+        return [file_stat.st_mtime_ns, file_stat.st_size]
+
+
+class ResultCache:
+    """On-disk cache of the outputs of cacheable commands.
+
+    Outputs are keyed on the command class, its parsed arguments, its input and the content
+    of its `input_files`.  Entries older than `max_age` are ignored and removed, and the least
+    recently used entries are removed once the cache grows past `max_size`.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory=None, max_size=256 * 1024**2, max_age=7 * 24 * 3600):
+        """Creates a result cache.
+
+        Args:
+            directory: Cache directory.  Defaults to `results` in `default_cache_dir()`.
+            max_size: Maximum total size of the cached outputs in bytes.
+            max_age: Seconds after which a cached output expires, or None to keep outputs
+              until they are evicted by size.
+        """
+        if directory is None:
+            directory = path.join(default_cache_dir(), "results")
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def key(self, command):
+        """Returns the cache key of a command instance, or None if its input cannot be hashed."""
+        command_class = type(command)
+        args = command.args
+        if hasattr(args, "_get_kwargs"):
+            args = args._get_kwargs()
+        try:
+            if isgenerator(command.input):
+                return None
+            data = pickle.dumps(
+                (
+                    ResultCache.VERSION,
+                    command_class.__module__,
+                    command_class.__qualname__,
+                    repr(args),
+                    command.input,
+                    [
+                        (file_path, self._file_digest(file_path))
+                        for file_path in command.input_files()
+                    ],
+                )
+            )
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return sha256(data).hexdigest()
+
+    def get(self, key):
+        """Returns whether an output is cached for a key, and the cached output."""
+        entry_path = self._entry_path(key)
+        try:
+            entry_stat = stat(entry_path)
+            if self._expired(entry_stat.st_mtime):
+                remove(entry_path)
+                return False, None
+            with open(entry_path, "rb") as f:
+                output = pickle.load(f)
+            # The access time records the last use for eviction, the modification time the age.
+            utime(entry_path, (time.time(), entry_stat.st_mtime))
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+        return True, output
+
+    def put(self, key, output):
+        """Stores the output of a command.
+
+        Generator outputs and outputs that cannot be pickled are not stored.
+
+        Returns:
+            True if the output was stored.
+        """
+        if isgenerator(output):
+            return False
+        try:
+            data = pickle.dumps(output)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+
+        entry_path = self._entry_path(key)
+        try:
+            makedirs(self.directory, exist_ok=True)
+            temp_path = "%s.%d.tmp" % (entry_path, getpid())
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            replace(temp_path, entry_path)
+        except OSError:
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Removes expired entries, then the least recently used ones past `max_size`."""
+        entries = []
+        try:
+            names = listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".pickle"):
+                continue
+            entry_path = path.join(self.directory, name)
+            try:
+                entry_stat = stat(entry_path)
+            except OSError:
+                continue
+            if self._expired(entry_stat.st_mtime):
+                self._remove(entry_path)
+            else:
+                entries.append((entry_stat.st_atime, entry_stat.st_size, entry_path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(entry_path)
+            total_size -= size
+
+    def _entry_path(self, key):
+        return path.join(self.directory, "%s.pickle" % key)
+
+    def _expired(self, modified_time):
+        return self.max_age is not None and time.time() - modified_time > self.max_age
+
+    @staticmethod
+    def _remove(entry_path):
+        try:
+            remove(entry_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _file_digest(file_path):
+        digest = sha256()
+        try:
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1024**2), b""):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
@@ -1,9 +1,28 @@
+import sys
 from argparse import ArgumentParser
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from copy import copy
+from fnmatch import fnmatchcase
+from itertools import islice
+from inspect import GEN_CREATED, getgeneratorstate, isabstract, isgenerator
+from os import path
 from sys import argv
+from time import perf_counter, sleep
 
 from .command import Command
+from .completion import build_completion_index, complete, completion_script
+from .context import ChainContext
+from .dispatchresult import DispatchResult
+from .instrument import Instrumentation, Span
 from .invokedcommand import InvokedCommand
+from .isolation import IsolatedRunner, shard_arguments
+from .keyindex import KeyTrie
+from .optimizer import format_plan, optimize_chain
+from .policy import ExecutionPolicy, call_with_timeout, format_status_report
+from .registry import CommandRegistry
+from .scheduler import build_dependencies, raise_first_error, run_async, run_threaded
+from .tokenizer import chunk_arguments, expand_argfiles, tokenize
 
 
 class CCLI:
@@ -12,6 +31,45 @@ class CCLI:
     # Flag to indicate the next string is not a new command.
     # Used for situations where arguments and commands share the same name.
     SKIP_NEXT_COMMAND = "--cli-skip-command"
+    # Flag to profile the CCLI phases and commands, optionally followed by =table, =json or
+    # =pstats.
+    PROFILE_FLAG = "--cli-profile"
+    # Flag to write a trace of the CCLI phases and commands, as --cli-trace=FILE.
+    TRACE_FLAG = "--cli-trace"
+    # Flag setting the trace format, chrome (the default) or otlp.
+    TRACE_FORMAT_FLAG = "--cli-trace-format"
+    # Flag to resume a chain from the checkpoint of an interrupted run.
+    RESUME_FLAG = "--cli-resume"
+    # Flag to run the chain again whenever one of its commands' input files changes,
+    # optionally followed by the debounce delay in seconds, as --cli-watch=0.2.
+    WATCH_FLAG = "--cli-watch"
+    # Flag printing the optimized plan of the chain instead of running it.
+    PLAN_FLAG = "--cli-plan"
+    # Flag capturing the output of each command, as --cli-output=live (the default) or grouped.
+    OUTPUT_FLAG = "--cli-output"
+    # Flag to run the command lines of a file instead of the arguments, as --cli-batch=FILE.
+    # Files ending in .jsonl are read as JSON Lines and - reads standard input.
+    BATCH_FLAG = "--cli-batch"
+    # Flag setting how many batch command lines run at the same time.
+    BATCH_WORKERS_FLAG = "--cli-batch-workers"
+    # Flag printing the completions of the last argument, used by the completion scripts.
+    COMPLETE_FLAG = "--cli-complete"
+    # Flag printing a shell completion script, as --cli-completion-script=bash, zsh or fish.
+    COMPLETION_SCRIPT_FLAG = "--cli-completion-script"
+    # Flags handled by the CCLI itself and never passed to commands.
+    RESERVED_FLAGS = (
+        PROFILE_FLAG,
+        TRACE_FLAG,
+        TRACE_FORMAT_FLAG,
+        RESUME_FLAG,
+        WATCH_FLAG,
+        PLAN_FLAG,
+        OUTPUT_FLAG,
+        BATCH_FLAG,
+        BATCH_WORKERS_FLAG,
+        COMPLETE_FLAG,
+        COMPLETION_SCRIPT_FLAG,
+    )
     # Default primary command key when none is provided
     NO_PRIMARY_COMMAND_KEY = "_ccli_none_key"
 
@@ -23,6 +81,21 @@ class CCLI:
         generate_help: bool = True,
         enable_chaining: bool = True,
         cli_args: list = None,
+        concurrent: bool = False,
+        max_workers: int = None,
+        command_registry: CommandRegistry = None,
+        cache_index: bool = False,
+        cache_dir: str = None,
+        allow_abbrev: bool = False,
+        drain_output: bool = True,
+        hooks: list = None,
+        result_cache=None,
+        argfile_prefix: str = None,
+        policy: ExecutionPolicy = None,
+        checkpoint: bool = False,
+        optimize: bool = True,
+        output_mode: str = None,
+        auto_run: bool = True,
     ):
         """Creates a CCLI, loads command subclasses, and runs each invoked command.
 
@@ -33,33 +106,482 @@ class CCLI:
             generate_help: Automatically generate help text. Defaults to True.
             enable_chaining: Enables chaining of multiple commands together.  Defaults to True.
             cli_args:  Arguments to pass to the CCLI.  Defaults to argv, primarily used for testing.
+            concurrent: Run commands marked as concurrent at the same time, honoring their
+              `after` dependencies.  Defaults to False.
+            max_workers: Maximum number of threads used for concurrent or synchronous commands
+              mixed with async commands, and of worker processes for isolated commands.
+            command_registry: Registry of lazily imported commands.  When provided, Command
+              subclasses are not discovered and only the invoked commands are imported.
+            cache_index: Store the command index on disk and reuse it until one of the command
+              modules changes.  Defaults to False.
+            cache_dir: Directory for cached data.  Defaults to the XDG cache directory.
+            allow_abbrev: Allow commands to be invoked by a unique prefix of their key.
+              Defaults to False.
+            drain_output: Consume generator outputs that no command read once the chain has
+              run, so generator commands at the end of a chain still do their work.
+              Defaults to True.
+            hooks: List of `InstrumentationHook`s notified when each phase and command starts
+              and finishes.
+            result_cache: Cache for the outputs of cacheable commands.  Defaults to a
+              `ResultCache` in the `results` directory of the cache directory.
+            argfile_prefix: Prefix of arguments naming a file to read more arguments from,
+              such as "@" for `@paths.txt`.  `@-` reads the arguments from stdin.
+              Defaults to None, which disables argument files.
+            policy: `ExecutionPolicy` of commands that do not set their own `policy`.
+              Defaults to running each command once and stopping at the first error.
+            checkpoint: Record each completed command on disk so an interrupted chain can be
+              resumed with `--cli-resume`.  Defaults to False.
+            optimize: Merge and drop adjacent invocations of commands declaring a
+              `merge_argument` or `idempotent` before instantiating them.  Defaults to True.
+            output_mode: Capture the stdout and stderr of each command and write it prefixed
+              by the command key as it is produced (`live`) or in one block per command once
+              the chain has run (`grouped`).  Defaults to None, which does not capture output.
+            auto_run: Run `cli_args` when the CCLI is created.  Set to False to only load the
+              available commands and run command chains with `dispatch`.  Defaults to True.
         """
         if cli_args is None:
             cli_args = argv
         self.name = name
+        self.primary_command_class = primary_command_class
         self.generate_help = generate_help
         self.chaining = enable_chaining
-        self.args = cli_args
-        self.available_commands = {}
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.allow_abbrev = allow_abbrev
+        self.drain_output = drain_output
+        self.argfile_prefix = argfile_prefix
+        self.policy = policy if policy is not None else ExecutionPolicy()
+        self.checkpoint = checkpoint
+        self.optimize = optimize
+        self.output_mode = output_mode
+        self.hooks = list(hooks or [])
+        self._result_cache = result_cache
+        self._key_index = None
+        self._completion_index = None
+        self._help_texts = {}
+        # Shared by every dispatch so isolated commands reuse the same worker processes.
+        self.isolated_runner = IsolatedRunner(max_workers)
+        reporters = self._prepare(cli_args)
+
+        if auto_run and cache_index and command_registry is None:
+            from .cache import CommandIndexCache
+
+            if self._answer_from_cache(CommandIndexCache(name, cache_dir)):
+                return
+
+        try:
+            with self.instrumentation.span("discovery"):
+                index_cache = None
+                if command_registry is None and cache_index:
+                    from .cache import CommandIndexCache
+
+                    index_cache = CommandIndexCache(name, cache_dir)
+                    command_registry = index_cache.load()
+
+                self.available_commands = (
+                    {} if command_registry is None else command_registry
+                )
+                if command_registry is None:
+                    self._build_command_map()
+                    if index_cache is not None:
+                        self._save_index(index_cache)
+            if auto_run:
+                self._run()
+        finally:
+            if auto_run:
+                self.close()
+            for reporter in reporters:
+                reporter.report()
+
+    def _run(self):
+        """
+        Runs the mode requested with the reserved flags: printing a completion script or
+        completions, running a batch file, watching the chain or running it once.
+        """
+        if CCLI.COMPLETION_SCRIPT_FLAG in self.cli_options:
+            shell = self.cli_options[CCLI.COMPLETION_SCRIPT_FLAG] or "bash"
+            prog = path.basename(self.args[0])
+            sys.stdout.write(completion_script(shell, prog, CCLI.COMPLETE_FLAG))
+        elif CCLI.COMPLETE_FLAG in self.cli_options:
+            self._print_completions(self.completion_index)
+        elif CCLI.BATCH_FLAG in self.cli_options:
+            self._run_batch_file()
+        elif CCLI.WATCH_FLAG in self.cli_options:
+            self._watch()
+        else:
+            self._execute()
+
+    def close(self):
+        """Stops the worker processes of isolated commands.
+
+        Only needed for CCLIs created with `auto_run=False`, once they stop dispatching.
+        """
+        self.isolated_runner.shutdown()
+
+    def _answer_from_cache(self, index_cache):
+        """
+        Prints completions or the help text stored with the cached command index, without
+        loading any command.
+
+        Returns:
+            True if the request was answered, False if the CCLI must load the commands.
+        """
+        if CCLI.COMPLETE_FLAG in self.cli_options:
+            completion_index = index_cache.load_extra("completion")
+            if completion_index is None:
+                return False
+            self.available_commands = {}
+            self._print_completions(completion_index)
+            return True
+
+        if self.generate_help and self._chain_args[1:] in (["-h"], ["--help"]):
+            help_text = index_cache.load_extra("help")
+            if help_text is None or help_text["columns"] != self._help_columns():
+                return False
+            self.available_commands = {}
+            sys.stdout.write(help_text["text"])
+            raise SystemExit(0)
+
+        return False
+
+    def _save_index(self, index_cache):
+        """
+        Saves the command index with its completion index and help text.
+        """
+        extras = {"completion": self.completion_index}
+        if self.generate_help:
+            extras["help"] = {"columns": self._help_columns(), "text": self.help_text()}
+        index_cache.save(self.available_commands, **extras)
+
+    def dispatch(self, args):
+        """Runs a command chain without rebuilding the available commands.
+
+        The CCLI is not modified, so the same CCLI can dispatch many command lines, including
+        from several threads at once.  Errors, including argparse exits, are returned instead of
+        being raised.  The reserved flags work as on the command line, so `--cli-complete`
+        prints completions and `--cli-watch` runs the chain until interrupted.
+
+            cli = CCLI(auto_run=False)
+            result = cli.dispatch(["seed", "a.sql", "start"])
+
+        Args:
+            args: Command line arguments, without the program name.
+
+        Returns:
+            A `DispatchResult` with the invoked commands and their exit code.
+        """
+        if self.allow_abbrev:
+            # Build the shared key index before copying so each dispatch does not rebuild it.
+            self.key_index
+
+        invocation = copy(self)
+        reporters = invocation._prepare([self.name] + list(args))
+        if CCLI.COMPLETE_FLAG in invocation.cli_options:
+            # Build the shared completion index so each completion does not rebuild it.
+            invocation._completion_index = self.completion_index
+        error = None
+        try:
+            invocation._run()
+        except (Exception, SystemExit) as e:
+            error = e
+        finally:
+            for reporter in reporters:
+                reporter.report()
+        return DispatchResult(invocation.invoked_commands, error)
+
+    @property
+    def completion_index(self):
+        """Keys and parser options of the available commands, built on first use."""
+        if self._completion_index is None:
+            primary_key = None
+            if self.primary_command_class is not None:
+                primary_key = self.primary_command.key
+            self._completion_index = build_completion_index(
+                self.available_commands, primary_key
+            )
+        return self._completion_index
+
+    def _print_completions(self, completion_index):
+        """
+        Prints the completions of the last argument, one per line.
+        """
+        completions = complete(
+            completion_index,
+            self._chain_args[1:],
+            chaining=self.chaining,
+            skip_flag=CCLI.SKIP_NEXT_COMMAND,
+        )
+        for completion in completions:
+            sys.stdout.write(completion + "\n")
+
+    def dispatch_batch(self, stream, json_lines=False, max_workers=None):
+        """Dispatches every command line of a text stream.
+
+        Args:
+            stream: Text stream with one command line per line.
+            json_lines: Read each line as a JSON list of arguments.  Defaults to splitting
+              lines like a shell would.
+            max_workers: Run up to this many command lines at the same time.
+              Defaults to running them one after another.
+
+        Returns:
+            A `BatchResult` for each command line.
+        """
+        from .batch import read_batch, run_batch
+
+        return run_batch(self, read_batch(stream, json_lines), max_workers)
+
+    def _run_batch_file(self):
+        """
+        Dispatches the command lines of the batch flag's file and reports the result of each
+        line on stderr.  Exits with code 1 if a command line failed.
+        """
+        file_path = self.cli_options[CCLI.BATCH_FLAG] or "-"
+        workers = self.cli_options.get(CCLI.BATCH_WORKERS_FLAG)
+        max_workers = int(workers) if workers else None
+        json_lines = file_path.endswith(".jsonl")
+
+        if file_path == "-":
+            results = self.dispatch_batch(sys.stdin, json_lines, max_workers)
+        else:
+            with open(file_path, encoding="utf8") as f:
+                results = self.dispatch_batch(f, json_lines, max_workers)
+
+        from .batch import format_report
+
+        sys.stderr.write(format_report(results) + "\n")
+        if any(not batch_result.result.ok for batch_result in results):
+            raise SystemExit(1)
+
+    def _prepare(self, args):
+        """
+        Resets the state of a command chain for a new list of arguments.
+
+        Returns:
+            The profiler and tracer requested with the reserved flags, which report once the
+            command chain has run.
+        """
+        self.args = args
         self.invoked_commands = []
+        self._checkpoint = None
+        self.context = None
+        self._output = None
+        self.cli_options, self._chain_args = self._split_reserved_flags(args)
+        self.instrumentation = Instrumentation(self.hooks)
+
+        reporters = []
+        if CCLI.PROFILE_FLAG in self.cli_options:
+            from .profiler import Profiler
 
-        if primary_command_class is not None:
-            self.primary_command = InvokedCommand(primary_command_class.key)
+            reporters.append(Profiler(self.cli_options[CCLI.PROFILE_FLAG] or "table"))
+        if CCLI.TRACE_FLAG in self.cli_options:
+            from .trace import FileExporter, Tracer
+
+            exporter = FileExporter(
+                self.cli_options[CCLI.TRACE_FLAG] or "ccli-trace.json",
+                self.cli_options.get(CCLI.TRACE_FORMAT_FLAG) or "chrome",
+            )
+            reporters.append(Tracer([exporter]))
+        for reporter in reporters:
+            self.instrumentation.add_hook(reporter)
+
+        if self.primary_command_class is not None:
+            self.primary_command = InvokedCommand(self.primary_command_class.key)
             self.invoked_commands.append(self.primary_command)
         else:
             # Define the primary command but do not add it to the list of invoked commands.
             self.primary_command = InvokedCommand(CCLI.NO_PRIMARY_COMMAND_KEY)
+        return reporters
+
+    def _execute(self):
+        """
+        Tokenizes, plans, instantiates and runs the prepared command chain.
+        With the plan flag the optimized chain is printed instead of run.
+        """
+        self._plan_commands()
+        if CCLI.PLAN_FLAG in self.cli_options:
+            sys.stdout.write(format_plan(self.invoked_commands) + "\n")
+            return
+        self._instantiate_commands()
+        self.context = ChainContext()
+        with self.context:
+            self._prepare_commands()
+            checkpoint = self._open_checkpoint()
+            with self.instrumentation.span("run"):
+                try:
+                    with self._capture_output():
+                        self._run_commands()
+                finally:
+                    self._report_status()
+                    if checkpoint is not None:
+                        checkpoint.close()
+            if checkpoint is not None:
+                checkpoint.delete()
+
+    def _capture_output(self):
+        """
+        Returns a context manager capturing the output of the commands it runs, when an
+        output mode is set with the output flag or the CCLI's `output_mode`.
+        """
+        if CCLI.OUTPUT_FLAG in self.cli_options:
+            mode = self.cli_options[CCLI.OUTPUT_FLAG] or "live"
+        else:
+            mode = self.output_mode
+        if mode is None:
+            self._output = None
+            return nullcontext()
+        from .output import OutputMultiplexer
+
+        self._output = OutputMultiplexer(mode)
+        return self._output
+
+    def _prepare_commands(self):
+        """
+        Gives each invoked command the chain's context and calls its prepare hook.
+        """
+        for cmd in self.invoked_commands:
+            cmd.instance.context = self.context
+            cmd.instance.prepare(self.context)
 
-        self._build_command_map()
-        self._build_invoked_commands()
+    def _watch(self):
+        """
+        Runs the chain, then runs it again each time an input file of its commands changes
+        until interrupted.  Only the commands from the first changed one onwards run again,
+        the earlier commands keep their outputs.  Files are watched while the chain runs, so
+        changes made during a run trigger the next one.
+        """
+        from .watch import create_watcher
+
+        debounce = float(self.cli_options[CCLI.WATCH_FLAG] or 0.1)
+        self._plan_commands()
         self._instantiate_commands()
-        self._run_commands()
+
+        position = 0
+        watcher = None
+        self.context = ChainContext()
+        try:
+            with self.context:
+                self._prepare_commands()
+                while True:
+                    paths = self._input_files()
+                    if watcher is None or watcher.paths != paths:
+                        if watcher is not None:
+                            watcher.close()
+                        watcher = create_watcher(paths) if paths else None
+                    self._rerun(position)
+                    if watcher is None:
+                        sys.stderr.write("No input files to watch.\n")
+                        return
+                    sys.stderr.write("Watching %d files for changes.\n" % len(paths))
+                    position = self._first_changed(watcher.wait(debounce))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if watcher is not None:
+                watcher.close()
+
+    def _rerun(self, position):
+        """
+        Runs the invoked commands from a position onwards, reusing the outputs of the
+        commands before it.  Errors are printed instead of raised.
+        """
+        for i, cmd in enumerate(self.invoked_commands):
+            if i >= position:
+                cmd.reset()
+            elif cmd.status == InvokedCommand.SUCCEEDED:
+                cmd.resumed = True
+        try:
+            with self.instrumentation.span("run"):
+                try:
+                    with self._capture_output():
+                        self._run_commands()
+                finally:
+                    self._report_status()
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+
+    def _input_files(self):
+        """
+        Returns the absolute paths of the input files of the invoked commands.
+        """
+        return {
+            path.abspath(file_path)
+            for cmd in self.invoked_commands
+            for file_path in cmd.instance.input_files()
+        }
+
+    def _first_changed(self, changed):
+        """
+        Returns the position of the first command that must run again after files changed.
+        Commands that did not succeed, or whose output was a generator that is already
+        consumed, run again too.
+        """
+        position = len(self.invoked_commands)
+        for i, cmd in enumerate(self.invoked_commands):
+            input_files = {path.abspath(f) for f in cmd.instance.input_files()}
+            if cmd.status != InvokedCommand.SUCCEEDED or input_files & changed:
+                position = i
+                break
+        while position > 0 and isgenerator(self.invoked_commands[position - 1].output):
+            position -= 1
+        return position
+
+    def _open_checkpoint(self):
+        """
+        Creates the checkpoint of the chain when checkpoints are enabled.  With the resume
+        flag, the commands completed by the previous run are restored from it.
+
+        Returns:
+            The chain's checkpoint, or None if checkpoints are disabled.
+        """
+        resume = CCLI.RESUME_FLAG in self.cli_options
+        if not (self.checkpoint or resume):
+            return None
+        from .checkpoint import ChainCheckpoint, resume_position
+
+        self._checkpoint = ChainCheckpoint(self.name, self._chain_args, self.cache_dir)
+        if resume:
+            records = self._checkpoint.load()
+            for cmd in self.invoked_commands[
+                : resume_position(self.invoked_commands, records)
+            ]:
+                record = records[self.invoked_commands.index(cmd)]
+                cmd.output = record.output
+                cmd.resumed = True
+        return self._checkpoint
+
+    @staticmethod
+    def _split_reserved_flags(args):
+        """
+        Separates the flags handled by the CCLI from the arguments of the command chain.
+        Reserved flags are given as `--flag` or `--flag=value`.
+
+        Returns:
+            A map of the reserved flags to their value (None when no value was given),
+            and the remaining arguments.
+        """
+        options = {}
+        chain_args = []
+        skip_command = False
+        for arg in args:
+            flag, equals, value = arg.partition("=")
+            if not skip_command and flag in CCLI.RESERVED_FLAGS:
+                options[flag] = value if equals else None
+                continue
+            skip_command = arg == CCLI.SKIP_NEXT_COMMAND
+            chain_args.append(arg)
+        return options, chain_args
 
     def _build_command_map(self):
-        """Loops over all the subclasses of Command and adds their key (short key and alt key if
-        available) and command class to the list of available commands.
+        """Loops over all the concrete subclasses of Command, including subclasses of
+        intermediate base classes, and adds their key (short key and alt key if available) and
+        command class to the list of available commands.
+        Raises an error if two commands share a key.
         """
-        for command in Command.__subclasses__():
+        for command in self._find_commands():
             command_keys = [
                 (command.key, True),
                 (command.short_key, False),
@@ -69,8 +591,34 @@ class CCLI:
                 key_str = self._get_command_key(
                     key_type, command.__name__, required=required
                 )
-                if key_str is not None:
-                    self.available_commands[key_str] = command
+                if key_str is None:
+                    continue
+                existing = self.available_commands.get(key_str, command)
+                if existing is not command:
+                    raise ValueError(
+                        "Key '%s' is used by both %s and %s"
+                        % (key_str, existing.__name__, command.__name__)
+                    )
+                self.available_commands[key_str] = command
+
+    @staticmethod
+    def _find_commands():
+        """
+        Returns all the concrete subclasses of Command, parents before their subclasses.
+        Abstract classes are skipped but their subclasses are still searched.
+        """
+        commands = []
+        seen = set()
+        stack = [Command]
+        while stack:
+            parent = stack.pop()
+            subclasses = [c for c in parent.__subclasses__() if c not in seen]
+            seen.update(subclasses)
+            for command in subclasses:
+                if not isabstract(command):
+                    commands.append(command)
+            stack.extend(reversed(subclasses))
+        return commands
 
     def _get_command_key(self, key, command_name, required=False):
         """
@@ -96,36 +644,71 @@ class CCLI:
         """
         Parses the arguments passed into the CCLI and assigns them to command classes.
         """
-        skip_command = False
-        current_command = self.primary_command
+        tokens = islice(self._chain_args, 1, None)
+        if self.argfile_prefix is not None:
+            tokens = expand_argfiles(tokens, self.argfile_prefix)
+        self.invoked_commands.extend(
+            tokenize(
+                tokens,
+                self.primary_command,
+                self._match_command,
+                chaining=self.chaining,
+                skip_flag=CCLI.SKIP_NEXT_COMMAND,
+            )
+        )
 
-        for i, arg in enumerate(self.args[1:]):
-            if arg == CCLI.SKIP_NEXT_COMMAND:
-                skip_command = True
-                continue
+    def _match_command(self, arg):
+        """
+        Returns the command key an argument invokes, or None if it is not a command.
+        Unique prefixes of keys are matched when abbreviations are allowed.
+        """
+        if arg in self.available_commands:
+            return arg
+        if self.allow_abbrev and arg and not arg.startswith("-"):
+            return self.key_index.unique_prefix(arg)
+        return None
 
-            if not skip_command and arg in self.available_commands:
-                if self.chaining:
-                    current_command = InvokedCommand(arg)
-                    self.invoked_commands.append(current_command)
-                    continue
+    @property
+    def key_index(self):
+        """Prefix tree of the available command keys, built on first use."""
+        if self._key_index is None:
+            if isinstance(self.available_commands, CommandRegistry):
+                identities = {
+                    key: self.available_commands.target(key)
+                    for key in self.available_commands
+                }
+            else:
+                identities = self.available_commands
+            self._key_index = KeyTrie(identities)
+        return self._key_index
 
-                else:
-                    # In single mode, add the rest of the arguments to the command.
-                    # Use i + 2 because the list is starting at index one, from the slice in the for loop.
-                    invoked_args = self.args[i + 2 :]
-                    current_command = InvokedCommand(arg, args=invoked_args)
-                    self.invoked_commands.append(current_command)
-                    break
+    def suggest_commands(self, arg, max_distance=2):
+        """Returns the command keys closest to a mistyped argument.
 
-            skip_command = False
-            current_command.args.append(arg)
+        Args:
+            arg: Argument that did not match a command.
+            max_distance: Maximum number of edits between the argument and a suggested key.
+        """
+        return self.key_index.suggest(arg, max_distance)
 
-    def _instantiate_commands(self):
+    def _plan_commands(self):
+        """
+        Tokenizes and parses the invoked commands, then optimizes the chain when enabled.
+        """
+        with self.instrumentation.span("tokenize"):
+            self._build_invoked_commands()
+        self._parse_commands()
+        if self.optimize:
+            with self.instrumentation.span("optimize"):
+                self.invoked_commands = optimize_chain(
+                    self.invoked_commands, self.available_commands
+                )
+
+    def _parse_commands(self):
         """
-        Instantiates the invoked commands by creating class instances.
+        Parses the arguments of the invoked commands.
         If help (-h, --help) was passed into the primary command then handle help text before
-        instantiation to prevent potential side effects of instantiating commands but not running them.
+        parsing to prevent potential side effects of instantiating commands but not running them.
         """
 
         # If the command help is handled by the CCLI,
@@ -136,57 +719,410 @@ class CCLI:
             and len(self.primary_command.args) > 0
             and self.primary_command.args[0] in ("-h", "--help")
         ):
-            self._make_help_text(self.primary_command.args)
+            help_args = list(self.primary_command.args)
+            chained = [
+                c for c in self.invoked_commands if c is not self.primary_command
+            ]
+            if len(help_args) == 1 and chained:
+                # `-h KEY` shows the help of the command invoked after the help flag.
+                help_args.append(chained[0].key)
+            self._make_help_text(help_args)
+
+        for cmd in self.invoked_commands:
+            command_class = self.available_commands[cmd.key]
+            with self.instrumentation.span("parse", key=cmd.key):
+                cmd.args = command_class.parse(cmd.args)
 
+    def _instantiate_commands(self):
+        """
+        Instantiates the parsed invoked commands by creating class instances.
+        """
+        invoked_commands = []
         for cmd in self.invoked_commands:
-            parsed_args = self.available_commands[cmd.key].parse(cmd.args)
-            cmd.instantiate(self.available_commands[cmd.key], parsed_args)
+            command_class = self.available_commands[cmd.key]
+            with self.instrumentation.span("instantiate", key=cmd.key):
+                # Commands with a chunk argument are invoked once per chunk of its values.
+                for i, chunk_args in enumerate(
+                    chunk_arguments(command_class, cmd.args)
+                ):
+                    chunk = cmd if i == 0 else InvokedCommand(cmd.key)
+                    chunk.instantiate(command_class, chunk_args)
+                    invoked_commands.append(chunk)
+        self.invoked_commands = invoked_commands
 
     def _run_commands(self):
         """
         Runs the invoked commands.
+        Commands run in chain order unless concurrency is enabled, in which case independent
+        commands run at the same time.  Async commands are driven by a single event loop.
+        Each command receives the output of the previous command in the chain as its input,
+        provided the previous command finished first.
+        The error of the first failed command is re-raised, once the chain has run if the
+        failed commands' policies continue on errors.
+        """
+        has_async = any(cmd.is_async for cmd in self.invoked_commands)
+        if not self.concurrent and not has_async:
+            for i, cmd in enumerate(self.invoked_commands):
+                if i > 0:
+                    cmd.upstream = self.invoked_commands[i - 1]
+                try:
+                    self._run_command(cmd)
+                except BaseException:
+                    for skipped in self.invoked_commands[i + 1 :]:
+                        skipped.status = InvokedCommand.SKIPPED
+                    raise
+            raise_first_error(self.invoked_commands)
+            self._drain_outputs()
+            return
+
+        command_classes = [
+            self.available_commands[cmd.key] for cmd in self.invoked_commands
+        ]
+        dependencies = build_dependencies(
+            command_classes, self.available_commands, self.concurrent
+        )
+        for i, cmd in enumerate(self.invoked_commands):
+            if i - 1 in dependencies[i]:
+                cmd.upstream = self.invoked_commands[i - 1]
+
+        if has_async:
+            run_async(
+                self.invoked_commands,
+                dependencies,
+                self._run_command,
+                self._run_command_async,
+                self.max_workers,
+            )
+        else:
+            run_threaded(
+                self.invoked_commands, dependencies, self._run_command, self.max_workers
+            )
+        self._drain_outputs()
+
+    def _drain_outputs(self):
         """
+        Consumes the generator outputs that were never started, in chain order.
+        """
+        if not self.drain_output:
+            return
         for cmd in self.invoked_commands:
-            cmd.instance.run()
+            if isgenerator(cmd.output) and getgeneratorstate(cmd.output) == GEN_CREATED:
+                deque(cmd.output, maxlen=0)
+
+    def _run_command(self, cmd):
+        """
+        Runs a single invoked command following its execution policy and records its status.
+        """
+        if cmd.resumed:
+            self._record_checkpoint(cmd)
+            cmd.status = InvokedCommand.SUCCEEDED
+            return
+        policy = self._policy(cmd)
+        cmd.status = InvokedCommand.RUNNING
+        cmd.instance.input = cmd.upstream_output()
+        start = perf_counter()
+        try:
+            with self._command_span(cmd), self._capture(cmd):
+                cache_key = self._restore_output(cmd)
+                if not cmd.cached:
+                    cmd.output = self._attempt(cmd, policy)
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, cmd.output)
+        except BaseException as e:
+            cmd.status = InvokedCommand.FAILED
+            cmd.error = e
+            if not (policy.continue_on_error and isinstance(e, Exception)):
+                raise
+        else:
+            cmd.status = InvokedCommand.SUCCEEDED
+            self._record_checkpoint(cmd)
+        finally:
+            cmd.duration = perf_counter() - start
+
+    def _attempt(self, cmd, policy):
+        """
+        Runs a command, retrying failed attempts as its policy allows.
+        """
+        timeout = self._timeout(cmd, policy)
+        while True:
+            cmd.attempts += 1
+            try:
+                if cmd.instance.shard_argument:
+                    return self._run_shards(cmd, timeout)
+                if cmd.instance.isolated:
+                    return self.isolated_runner.run(cmd, timeout)
+                return call_with_timeout(cmd.instance.run, timeout, cmd.key)
+            except policy.retry_on as e:
+                # An attempt that timed out in a thread is still running and is not retried.
+                if cmd.attempts > policy.retries or getattr(e, "still_running", False):
+                    raise
+            sleep(policy.delay(cmd.attempts))
+
+    def _run_shards(self, cmd, timeout):
+        """
+        Runs the shards of a sharded command in worker processes and returns their outputs.
+        The error of the first failed shard is raised once every shard has run.
+        """
+        shards = shard_arguments(
+            type(cmd.instance), cmd.args, self.isolated_runner.workers
+        )
+        outputs, cmd.shard_errors = self.isolated_runner.run_shards(
+            cmd, shards, cmd.instance.shard_ordered, timeout
+        )
+        if cmd.shard_errors:
+            raise cmd.shard_errors[min(cmd.shard_errors)]
+        return outputs
+
+    async def _run_command_async(self, cmd):
+        """
+        Awaits a single invoked command with an async run method and records its status.
+        """
+        if cmd.resumed:
+            self._record_checkpoint(cmd)
+            cmd.status = InvokedCommand.SUCCEEDED
+            return
+        policy = self._policy(cmd)
+        cmd.status = InvokedCommand.RUNNING
+        cmd.instance.input = cmd.upstream_output()
+        start = perf_counter()
+        try:
+            with self._command_span(cmd), self._capture(cmd):
+                cache_key = self._restore_output(cmd)
+                if not cmd.cached:
+                    cmd.output = await self._attempt_async(cmd, policy)
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, cmd.output)
+        except BaseException as e:
+            cmd.status = InvokedCommand.FAILED
+            cmd.error = e
+            if not (policy.continue_on_error and isinstance(e, Exception)):
+                raise
+        else:
+            cmd.status = InvokedCommand.SUCCEEDED
+            self._record_checkpoint(cmd)
+        finally:
+            cmd.duration = perf_counter() - start
+
+    async def _attempt_async(self, cmd, policy):
+        """
+        Awaits a command, retrying failed attempts as its policy allows.
+        """
+        import asyncio
+
+        timeout = self._timeout(cmd, policy)
+        while True:
+            cmd.attempts += 1
+            try:
+                try:
+                    return await asyncio.wait_for(cmd.instance.run(), timeout)
+                except asyncio.TimeoutError:
+                    # asyncio.TimeoutError is only the builtin TimeoutError from Python 3.11.
+                    raise TimeoutError(
+                        "Command %s timed out after %s seconds" % (cmd.key, timeout)
+                    ) from None
+            except policy.retry_on:
+                if cmd.attempts > policy.retries:
+                    raise
+            await asyncio.sleep(policy.delay(cmd.attempts))
+
+    def _record_checkpoint(self, cmd):
+        if self._checkpoint is not None:
+            self._checkpoint.record(self.invoked_commands.index(cmd), cmd)
+
+    def _policy(self, cmd):
+        """
+        Returns the execution policy of an invoked command.
+        """
+        if cmd.instance.policy is not None:
+            return cmd.instance.policy
+        return self.policy
+
+    @staticmethod
+    def _timeout(cmd, policy):
+        if cmd.instance.timeout is not None:
+            return cmd.instance.timeout
+        return policy.timeout
+
+    def _report_status(self):
+        """
+        Writes the status of each command to stderr when a command was retried or failed
+        without stopping the chain.
+        """
+        if any(
+            cmd.attempts > 1
+            or (
+                cmd.status == InvokedCommand.FAILED
+                and self._policy(cmd).continue_on_error
+            )
+            for cmd in self.invoked_commands
+        ):
+            sys.stderr.write(format_status_report(self.invoked_commands) + "\n")
+
+    @property
+    def result_cache(self):
+        """Cache of the outputs of cacheable commands, created on first use."""
+        if self._result_cache is None:
+            from .cache import ResultCache
+
+            directory = self.cache_dir and path.join(self.cache_dir, "results")
+            self._result_cache = ResultCache(directory)
+        return self._result_cache
+
+    def _restore_output(self, cmd):
+        """
+        Restores the output of a cacheable command from the result cache.
+
+        Returns:
+            The key to store the command's output under, or None if the command is not
+            cacheable or its output was restored.
+        """
+        if not cmd.instance.cacheable:
+            return None
+        cache_key = self.result_cache.key(cmd.instance)
+        if cache_key is None:
+            return None
+        cmd.cached, output = self.result_cache.get(cache_key)
+        if cmd.cached:
+            cmd.output = output
+            return None
+        return cache_key
+
+    def _capture(self, cmd):
+        """
+        Returns a context manager capturing the output of an invoked command while it runs.
+        """
+        if self._output is None:
+            return nullcontext()
+        return self._output.capture(cmd)
+
+    def _command_span(self, cmd):
+        return self.instrumentation.span(
+            "run",
+            Span.COMMAND,
+            key=cmd.key,
+            position=self.invoked_commands.index(cmd),
+            args=cmd.args,
+        )
 
     def _make_help_text(self, args):
         """
-        Utilizes argparse's help text generator to make help text for all the available commands.
+        Prints help text and exits.
+
+        `-h` lists all the available commands, `-h KEY` shows the help of a single command and
+        `-h PATTERN` lists the commands matching a shell style pattern, such as `-h db*`.
 
         Args:
             args: List of arguments to parse help text for. Usually -h or --help but can be
               something else if the primary_command_class has a custom parser.
         """
+        topic = None
+        if len(args) > 1 and not args[1].startswith("-"):
+            topic = args[1]
+
+        if topic is not None and topic in self.available_commands:
+            command_class = self.available_commands[topic]
+            parser = command_class.build_parser()
+            if parser is None:
+                parser = ArgumentParser(prog=topic)
+            text = parser.format_help()
+        elif topic is not None and not any(
+            fnmatchcase(key, topic) for key in self.available_commands
+        ):
+            message = "No commands match '%s'." % topic
+            suggestions = self.suggest_commands(topic)
+            if suggestions:
+                message += " Did you mean: %s?" % ", ".join(suggestions)
+            sys.stderr.write(message + "\n")
+            raise SystemExit(2)
+        else:
+            text = self.help_text(topic)
+
+        sys.stdout.write(text)
+        raise SystemExit(0)
+
+    def help_text(self, pattern=None):
+        """Returns the help text listing the available commands.
+
+        The text is generated once per pattern and reused by later calls and dispatches.
+
+        Args:
+            pattern: Optional shell style pattern.  Only commands with a matching key are listed.
+        """
+        if pattern not in self._help_texts:
+            self._help_texts[pattern] = self._build_help_parser(pattern).format_help()
+        return self._help_texts[pattern]
+
+    def _build_help_parser(self, pattern=None):
+        """
+        Utilizes argparse's help text generator to make help text for the available commands.
+        The primary command's parser is used as a parent so it is not modified.
+        """
         primary_command_cls = None
         if self.primary_command.key is not CCLI.NO_PRIMARY_COMMAND_KEY:
             primary_command_cls = self.available_commands[self.primary_command.key]
 
-        if primary_command_cls is not None and primary_command_cls.parser is not None:
-            parser = primary_command_cls.parser
-            parser.prog = self.name
+        primary_parser = None
+        if primary_command_cls is not None:
+            primary_parser = primary_command_cls.build_parser()
+
+        if primary_parser is not None:
+            parser = ArgumentParser(
+                prog=self.name,
+                usage=primary_parser.usage,
+                description=primary_parser.description,
+                epilog=primary_parser.epilog,
+                formatter_class=primary_parser.formatter_class,
+                parents=[primary_parser],
+                add_help=False,
+            )
         else:
             parser = ArgumentParser(prog=self.name)
 
         sub = parser.add_subparsers(help="Available commands")
 
-        available_commands_inverse = defaultdict(list)
-        for key, command_class in self.available_commands.items():
-            available_commands_inverse[command_class].append(key)
-
-        for command_class, keys in available_commands_inverse.items():
+        for keys, description in self._command_descriptions():
             if self.primary_command.key in keys:
                 continue
+            if pattern is not None and not any(fnmatchcase(k, pattern) for k in keys):
+                continue
 
             all_keys = ",".join(keys)
 
-            if (
-                command_class.parser is not None
-                and command_class.parser.description is not None
-            ):
-                help_text = command_class.parser.description
+            if description is not None:
+                help_text = description
             else:
                 help_text = "Run %s -h for more information" % all_keys
 
             sub.add_parser(all_keys, help=help_text)
 
-        parser.parse_known_args(args)
+        return parser
+
+    @staticmethod
+    def _help_columns():
+        """Terminal width used by argparse to wrap help text."""
+        from shutil import get_terminal_size
+
+        return get_terminal_size().columns
+
+    def _command_descriptions(self):
+        """
+        Returns a list of each available command's keys and description.
+        Descriptions of registry commands are read from the registry without importing them.
+        """
+        if isinstance(self.available_commands, CommandRegistry):
+            return [
+                (keys, self.available_commands.description(keys[0]))
+                for keys in self.available_commands.groups().values()
+            ]
+
+        available_commands_inverse = defaultdict(list)
+        for key, command_class in self.available_commands.items():
+            available_commands_inverse[command_class].append(key)
+
+        descriptions = []
+        for command_class, keys in available_commands_inverse.items():
+            description = command_class.description
+            if command_class.parser is not None:
+                description = command_class.parser.description
+            descriptions.append((keys, description))
+        return descriptions
@@ -0,0 +1,132 @@
+import json
+import pickle
+import sys
+from hashlib import sha256
+from inspect import isgenerator
+from os import getcwd, makedirs, path, remove
+from threading import Lock
+
+from .cache import default_cache_dir
+
+
+class CheckpointRecord:
+    """Completed command stored in a checkpoint."""
+
+    def __init__(self, position, args, saved, output):
+        self.position = position
+        # Representation of the parsed arguments, compared when resuming.
+        self.args = args
+        # False if the output could not be pickled and was not stored.
+        self.saved = saved
+        self.output = output
+
+
+class ChainCheckpoint:
+    """Append-only log of the commands of a chain that completed.
+
+    The checkpoint of a chain is identified by a fingerprint of the CLI, the working directory
+    and the chain's arguments.  One record is appended and flushed as each command completes,
+    so a chain killed at any point can be resumed from its last completed command.
+    """
+
+    VERSION = 1
+
+    def __init__(self, name, chain_args, directory=None):
+        """Creates the checkpoint of a command chain.
+
+        Args:
+            name: Name of the command line interface.
+            chain_args: Arguments of the chain, without reserved flags.
+            directory: Cache directory.  Checkpoints are stored in its `checkpoints` directory.
+              Defaults to `default_cache_dir()`.
+        """
+        if directory is None:
+            directory = default_cache_dir()
+        script = path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else ""
+        fingerprint = json.dumps(
+            [ChainCheckpoint.VERSION, name, script, getcwd(), list(chain_args[1:])]
+        )
+        self.fingerprint = sha256(fingerprint.encode("utf8")).hexdigest()
+        self.path = path.join(
+            directory, "checkpoints", "chain-%s.pickle" % self.fingerprint
+        )
+        self._file = None
+        self._lock = Lock()
+
+    def load(self):
+        """Returns the records of the previous run of the chain, by position."""
+        records = {}
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return records
+
+        with f:
+            try:
+                if pickle.load(f) != ("ccli-checkpoint", self.fingerprint):
+                    return records
+                while True:
+                    record = pickle.load(f)
+                    records[record.position] = record
+            except Exception:
+                # The log ends at the first truncated or unreadable record.
+                pass
+        return records
+
+    def record(self, position, cmd):
+        """Appends the record of a completed invoked command.
+
+        Outputs that are generators or cannot be pickled are not stored.
+        """
+        args = repr(cmd.args)
+        data = None
+        if not isgenerator(cmd.output):
+            try:
+                data = pickle.dumps(CheckpointRecord(position, args, True, cmd.output))
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pass
+        if data is None:
+            data = pickle.dumps(CheckpointRecord(position, args, False, None))
+
+        with self._lock:
+            try:
+                if self._file is None:
+                    makedirs(path.dirname(self.path), exist_ok=True)
+                    self._file = open(self.path, "wb")
+                    pickle.dump(("ccli-checkpoint", self.fingerprint), self._file)
+                self._file.write(data)
+                self._file.flush()
+            except OSError:
+                # Checkpoints are best effort, the chain keeps running without them.
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def delete(self):
+        """Removes the checkpoint once the chain has completed."""
+        self.close()
+        try:
+            remove(self.path)
+        except OSError:
+            pass
+
+
+def resume_position(invoked_commands, records):
+    """Returns the position of the first invoked command that must run again.
+
+    Commands are resumed while their record's arguments match.  A completed command whose
+    output was not stored is run again so the command after it receives its input.
+    """
+    position = 0
+    while position < len(invoked_commands):
+        record = records.get(position)
+        if record is None or record.args != repr(invoked_commands[position].args):
+            break
+        position += 1
+    while position > 0 and not records[position - 1].saved:
+        position -= 1
+    return position
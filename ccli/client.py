@@ -0,0 +1,94 @@
+"""Thin client forwarding a command line to a CCLI server.
+
+Only the standard library is imported so the client starts quickly.  For the lowest latency
+run this file directly instead of importing the ccli package:
+
+    python -S path/to/ccli/client.py /tmp/project.sock seed a.sql start
+"""
+
+import array
+import json
+import os
+import socket
+import struct
+import sys
+
+# Frame header holding the length of a JSON request.
+HEADER = struct.Struct("!I")
+# Response holding the exit code of the command chain.
+EXIT_CODE = struct.Struct("!i")
+
+
+def send_frame(sock, data):
+    payload = json.dumps(data).encode("utf8")
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by the CCLI server")
+        data += chunk
+    return data
+
+
+def recv_frame(sock):
+    (size,) = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    return json.loads(recv_exactly(sock, size).decode("utf8"))
+
+
+def send_fds(sock, fds):
+    """Sends file descriptors with a one byte message, like `socket.send_fds` of Python 3.9."""
+    sock.sendmsg(
+        [b"\0"], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+    )
+
+
+def recv_fds(sock, max_fds):
+    """Receives file descriptors sent with `send_fds`."""
+    fds = array.array("i")
+    _, ancdata, _, _ = sock.recvmsg(1, socket.CMSG_LEN(max_fds * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[: len(data) - len(data) % fds.itemsize])
+    return list(fds)
+
+
+def run(socket_path, args):
+    """Runs a command chain on a CCLI server.
+
+    The client's stdin, stdout and stderr are passed to the server, so the commands read and
+    write the client's streams directly.
+
+    Args:
+        socket_path: Path of the server's Unix socket.
+        args: Command line arguments, without the program name.
+
+    Returns:
+        The exit code of the command chain.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_fds(sock, [0, 1, 2])
+        send_frame(sock, {"args": args, "cwd": os.getcwd(), "env": dict(os.environ)})
+        (exit_code,) = EXIT_CODE.unpack(recv_exactly(sock, EXIT_CODE.size))
+        return exit_code
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.stderr.write("usage: client.py SOCKET [ARGS ...]\n")
+        return 2
+    try:
+        return run(sys.argv[1], sys.argv[2:])
+    except OSError as e:
+        sys.stderr.write(
+            "Could not reach the CCLI server at %s: %s\n" % (sys.argv[1], e)
+        )
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
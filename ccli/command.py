@@ -4,6 +4,8 @@
 from argparse import ArgumentParser
 from abc import ABC, abstractmethod
 
+from .arguments import CompiledParser
+
 
 class Command(ABC):
     """Base class for commands runnable from the CCLI.
@@ -21,6 +23,47 @@ class Command(ABC):
     """
 
     parser = None
+    # `Argument` declarations compiled into a fast parser, used when `parser` is not set.
+    arguments = ()
+    # Description shown in help text for commands declaring `arguments`.
+    description = None
+    # Output of the previous command in the chain, set before `run` is called.
+    input = None
+    # `ChainContext` with the resources shared by the chain, set before `prepare` is called.
+    # Isolated commands run in another process and have no context.
+    context = None
+    # Keys of commands that must finish before this command runs.
+    after = ()
+    # Allows the command to run at the same time as other concurrent commands.
+    concurrent = False
+    # Runs the command in a worker process.  Its parsed args, input and output are pickled.
+    isolated = False
+    # Seconds the command may run before it fails with a TimeoutError.
+    timeout = None
+    # `ExecutionPolicy` with retries and error handling.  Defaults to the CCLI's policy.
+    policy = None
+    # Seconds of CPU time an isolated command may use.
+    cpu_time_limit = None
+    # Bytes of address space an isolated command's worker may use.
+    memory_limit = None
+    # Reuses the output of an earlier run with the same arguments, input and input files.
+    cacheable = False
+    # Name of a list argument split into chunks of `chunk_size` values.  The command is
+    # invoked once per chunk, as if it had been repeated in the chain.
+    chunk_argument = None
+    chunk_size = None
+    # Name of a list argument split into shards run in parallel worker processes, each of
+    # `shard_size` values or spread evenly over the workers.  The output is the list of the
+    # shards' outputs, in shard order unless `shard_ordered` is False.
+    shard_argument = None
+    shard_size = None
+    shard_ordered = True
+    # Name of a list argument on which adjacent invocations with otherwise equal arguments
+    # are merged, so `seed a.sql seed b.sql` runs once with both files.
+    merge_argument = None
+    # Running the command again with the same arguments has no further effect, so an
+    # invocation repeating the previous one is dropped.
+    idempotent = False
 
     @classmethod
     @abstractmethod
@@ -47,17 +90,61 @@ class Command(ABC):
         """Runs the command.
 
         Called from the CCLI when the command invoked.
+        The return value is stored as the invoked command's output and passed to the next
+        command in the chain as its `input`.  Return a generator to stream items to the
+        next command without holding the whole dataset in memory.
+        May also be implemented as `async def run(self)`, in which case the CCLI awaits it
+        on a shared event loop.
+        """
+
+    def prepare(self, context):
+        """Called with the chain's `ChainContext` once every command has been instantiated.
+
+        Register the resources the command shares with other commands of the chain here.
+        Resources are only created when a command gets them.
+        """
+
+    def input_files(self):
+        """Paths of the files the command reads.
+
+        Cacheable commands are run again when the content of one of these files changes.
         """
+        return ()
 
     def __repr__(self):
         return "Command(key=%s, args=%s)" % (self.key, self.args)
 
+    @classmethod
+    def compiled_parser(cls):
+        """Returns the `CompiledParser` of the command's `arguments`, compiled on first use."""
+        # Looked up on the class itself so subclasses compile their own parser.
+        compiled = cls.__dict__.get("_compiled_parser")
+        if compiled is None:
+            prog = cls.key() if callable(cls.key) else cls.key
+            compiled = CompiledParser(cls.arguments, prog, cls.description)
+            cls._compiled_parser = compiled
+        return compiled
+
+    @classmethod
+    def build_parser(cls):
+        """Returns the argparse parser of the command, used for help text and completion.
+
+        Returns None if the command has neither a `parser` nor `arguments`.
+        """
+        if cls.parser is not None:
+            return cls.parser
+        if cls.arguments:
+            return cls.compiled_parser().parser
+        return None
+
     @classmethod
     def parse(cls, args_list):
         """Default argument parser.
 
         This may be overridden to provide a different argument parser.
         """
+        if cls.parser is None and cls.arguments:
+            return cls.compiled_parser().parse_args(args_list)
         # If the user chose not to implement their own parser/args, use a default parser.
         if cls.parser is None:
             cls.parser = ArgumentParser(prog=str(cls.key))
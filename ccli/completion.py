@@ -0,0 +1,131 @@
+import re
+from argparse import ArgumentParser
+from collections import defaultdict
+
+
+def build_completion_index(available_commands, primary_key=None):
+    """Builds the data needed to complete a command line.
+
+    Args:
+        available_commands: Map of command keys to command classes.
+        primary_key: Key of the primary command, whose options are completed before the
+          first command.
+
+    Returns:
+        A JSON serializable dictionary with the command keys and, for each key, the command's
+        option strings, the options that take a value and the choices of those options.
+    """
+    keys_by_class = defaultdict(list)
+    for key, command_class in available_commands.items():
+        keys_by_class[command_class].append(key)
+
+    commands = {}
+    for command_class, keys in keys_by_class.items():
+        parser = command_class.build_parser()
+        if parser is None:
+            parser = ArgumentParser(add_help=True)
+
+        options = []
+        takes_value = []
+        choices = {}
+        for action in parser._actions:
+            options.extend(action.option_strings)
+            if action.option_strings and action.nargs != 0:
+                takes_value.extend(action.option_strings)
+                if action.choices is not None:
+                    for option in action.option_strings:
+                        choices[option] = [str(choice) for choice in action.choices]
+
+        completion = {
+            "options": options,
+            "takes_value": takes_value,
+            "choices": choices,
+        }
+        for key in keys:
+            commands[key] = completion
+
+    return {
+        "keys": [key for key in available_commands if key != primary_key],
+        "primary": primary_key,
+        "commands": commands,
+    }
+
+
+def complete(index, words, chaining=True, skip_flag=None):
+    """Returns the completions of the last word of a command line.
+
+    Args:
+        index: Completion index created by `build_completion_index`.
+        words: Words of the command line after the program name.  The last word is the one
+          being completed and may be empty.
+        chaining: Complete command keys after the first command.
+        skip_flag: Flag marking the next word as an argument instead of a command.
+    """
+    if not words:
+        words = [""]
+    *previous_words, current = words
+
+    command = index["primary"]
+    skip_command = False
+    for word in previous_words:
+        if word == skip_flag:
+            skip_command = True
+            continue
+        if not skip_command and word in index["commands"] and word != index["primary"]:
+            if command != index["primary"] and not chaining:
+                # Without chaining the remaining words are arguments of the first command.
+                break
+            command = word
+        skip_command = False
+
+    completion = index["commands"].get(command)
+    if completion is not None and previous_words:
+        previous = previous_words[-1]
+        if previous in completion["takes_value"]:
+            return _matching(completion["choices"].get(previous, []), current)
+
+    if current.startswith("-"):
+        if completion is None:
+            return []
+        return _matching(completion["options"], current)
+
+    if skip_command or (not chaining and command != index["primary"]):
+        return []
+    return _matching(index["keys"], current)
+
+
+def _matching(candidates, prefix):
+    return [candidate for candidate in candidates if candidate.startswith(prefix)]
+
+
+def completion_script(shell, prog, complete_flag):
+    """Returns a script registering completion for `prog` in bash, zsh or fish."""
+    function = "_ccli_complete_%s" % re.sub(r"\W", "_", prog)
+    if shell == "bash":
+        return (
+            "%(function)s() {\n"
+            "    local IFS=$'\\n'\n"
+            '    COMPREPLY=($(%(prog)s %(flag)s "${COMP_WORDS[@]:1:COMP_CWORD}"))\n'
+            "}\n"
+            "complete -o default -F %(function)s %(prog)s\n"
+        ) % {"function": function, "prog": prog, "flag": complete_flag}
+    if shell == "zsh":
+        return (
+            "#compdef %(prog)s\n"
+            "%(function)s() {\n"
+            "    local -a candidates\n"
+            '    candidates=("${(@f)$(%(prog)s %(flag)s "${(@)words[2,CURRENT]}")}")\n'
+            "    compadd -a candidates\n"
+            "}\n"
+            "compdef %(function)s %(prog)s\n"
+        ) % {"function": function, "prog": prog, "flag": complete_flag}
+    if shell == "fish":
+        return (
+            "function %(function)s\n"
+            "    set -l tokens (commandline -opc)\n"
+            "    set -l current (commandline -ct)\n"
+            '    %(prog)s %(flag)s $tokens[2..-1] "$current"\n'
+            "end\n"
+            "complete -c %(prog)s -f -a '(%(function)s)'\n"
+        ) % {"function": function, "prog": prog, "flag": complete_flag}
+    raise ValueError("Unsupported shell '%s', expected bash, zsh or fish" % shell)
@@ -0,0 +1,106 @@
+import sys
+from threading import Lock
+
+_MISSING = object()
+
+
+class ChainContext:
+    """Resources shared by the commands of a chain, such as connection pools and clients.
+
+    Commands register resources in `Command.prepare` and get them while running.  A resource
+    is created by its factory the first time it is requested and torn down once the chain has
+    run, in reverse order of creation.
+
+        class Seed(Command):
+            key = "seed"
+
+            def prepare(self, context):
+                context.register("db", connect_pool, teardown=lambda pool: pool.close())
+
+            def run(self):
+                with self.context.get("db").connection() as connection:
+                    ...
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._resources = {}
+        self._creation_locks = {}
+        self._lock = Lock()
+
+    def register(self, name, factory, teardown=None):
+        """Registers a lazily created resource.
+
+        The first registration of a name is kept, so every command registering the same
+        resource shares one instance of it.
+
+        Args:
+            name: Name the resource is requested by.
+            factory: Callable without arguments returning the resource.
+            teardown: Callable receiving the resource once the chain has run.
+        """
+        with self._lock:
+            self._factories.setdefault(name, (factory, teardown))
+
+    def get(self, name):
+        """Returns a resource, creating it on first use.
+
+        Safe to call from concurrent commands.  The factory of a resource is called once, and
+        other commands requesting the resource wait until it is created.
+
+        Raises:
+            KeyError: If no resource is registered with the name.
+        """
+        resource = self._resources.get(name, _MISSING)
+        if resource is not _MISSING:
+            return resource
+
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError("No resource registered as %s" % name)
+            creation_lock = self._creation_locks.setdefault(name, Lock())
+        with creation_lock:
+            resource = self._resources.get(name, _MISSING)
+            if resource is _MISSING:
+                resource = self._factories[name][0]()
+                with self._lock:
+                    self._resources[name] = resource
+        return resource
+
+    def __contains__(self, name):
+        return name in self._factories
+
+    def close(self):
+        """Tears down the created resources in reverse order of creation.
+
+        Every teardown is called, then the first teardown error is raised.
+        """
+        with self._lock:
+            resources = list(self._resources.items())
+            self._resources.clear()
+
+        error = None
+        for name, resource in reversed(resources):
+            teardown = self._factories[name][1]
+            if teardown is None:
+                continue
+            try:
+                teardown(resource)
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # Teardown errors must not hide the error that stopped the chain.
+        try:
+            self.close()
+        except Exception as e:
+            sys.stderr.write("Error tearing down chain resources: %s\n" % e)
@@ -0,0 +1,42 @@
+class DispatchResult:
+    """Outcome of a command chain run with `CCLI.dispatch`."""
+
+    def __init__(self, invoked_commands, error=None):
+        """Creates a dispatch result.
+
+        Args:
+            invoked_commands: Invoked commands of the chain, in chain order.
+            error: Exception that stopped the chain, if any.
+        """
+        self.invoked_commands = invoked_commands
+        self.error = error
+
+    @property
+    def exit_code(self):
+        """Process exit code equivalent of the result, following `sys.exit` conventions."""
+        if self.error is None:
+            return 0
+        if isinstance(self.error, SystemExit):
+            if self.error.code is None:
+                return 0
+            if isinstance(self.error.code, int):
+                return self.error.code
+            return 1
+        return 1
+
+    @property
+    def ok(self):
+        return self.exit_code == 0
+
+    @property
+    def output(self):
+        """Output of the last invoked command."""
+        if not self.invoked_commands:
+            return None
+        return self.invoked_commands[-1].output
+
+    def __repr__(self):
+        return "DispatchResult(exit_code=%s, invoked_commands=%s)" % (
+            self.exit_code,
+            self.invoked_commands,
+        )
@@ -0,0 +1,112 @@
+from contextlib import nullcontext
+from contextvars import ContextVar
+from os import urandom
+from threading import get_ident
+from time import perf_counter, thread_time, time
+
+# Span that is open in the current thread or task, the parent of spans started inside it.
+_current_span = ContextVar("ccli_current_span", default=None)
+
+
+class Span:
+    """Timing of one CCLI phase or one invoked command run."""
+
+    # Span categories
+    PHASE = "phase"
+    COMMAND = "command"
+
+    def __init__(self, name, category, attributes, trace_id=None, parent_id=None):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.thread_id = get_ident()
+        # Hex identifiers following the OpenTelemetry format.
+        self.trace_id = trace_id
+        self.span_id = urandom(8).hex()
+        self.parent_id = parent_id
+        # Wall clock time in seconds since the epoch.
+        self.start_time = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_memory = None
+        self.error = None
+
+    def __repr__(self):
+        return "Span(name=%s, category=%s, wall_time=%s)" % (
+            self.name,
+            self.category,
+            self.wall_time,
+        )
+
+
+class InstrumentationHook:
+    """Base class for receiving spans from the CCLI.
+
+    Hooks are called on the thread running the phase or command.
+    """
+
+    def span_started(self, span):
+        """Called when a phase or command starts."""
+
+    def span_finished(self, span):
+        """Called when a phase or command finishes, successfully or not."""
+
+
+class Instrumentation:
+    """Measures the CCLI phases and invoked commands and notifies the registered hooks.
+
+    Spans are only measured while at least one hook is registered.
+    """
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self._trace_id = None
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def span(self, name, category=Span.PHASE, **attributes):
+        """Returns a context manager measuring a phase or command.
+
+        Args:
+            name: Name of the phase or command.
+            category: `Span.PHASE` or `Span.COMMAND`.
+            attributes: Extra details stored on the span, such as the command key.
+        """
+        if not self.hooks:
+            return nullcontext()
+        if self._trace_id is None:
+            self._trace_id = urandom(16).hex()
+
+        parent = _current_span.get()
+        parent_id = None
+        if parent is not None and parent.trace_id == self._trace_id:
+            parent_id = parent.span_id
+        span = Span(name, category, attributes, self._trace_id, parent_id)
+        return _SpanContext(self.hooks, span)
+
+
+class _SpanContext:
+    def __init__(self, hooks, span):
+        self.hooks = list(hooks)
+        self.span = span
+        self._start = None
+        self._start_cpu = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        for hook in self.hooks:
+            hook.span_started(self.span)
+        self.span.start_time = time()
+        self._start = perf_counter()
+        self._start_cpu = thread_time()
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.span.wall_time = perf_counter() - self._start
+        self.span.cpu_time = thread_time() - self._start_cpu
+        self.span.error = exc_value
+        _current_span.reset(self._token)
+        for hook in reversed(self.hooks):
+            hook.span_finished(self.span)
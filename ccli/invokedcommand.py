@@ -1,6 +1,16 @@
+from inspect import iscoroutinefunction
+
+
 class InvokedCommand:
     """Contains information about a command once it has been invoked in the CLI."""
 
+    # Execution status values
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
     def __init__(self, key, args=None, instance=None):
         if args is None:
             args = []
@@ -9,11 +19,60 @@ class InvokedCommand:
         self.args = args
         self.instance = instance
         self.output = None
+        self.status = InvokedCommand.PENDING
+        self.error = None
+        # True if the output was restored from the result cache instead of running the command.
+        self.cached = False
+        # True if the output of an earlier run is reused instead of running the command, when
+        # resuming from a checkpoint or re-running a watched chain.
+        self.resumed = False
+        # Number of times the command was run, including retries.
+        self.attempts = 0
+        # Seconds spent running the command, including retries and waits between them.
+        self.duration = None
+        # Invoked command whose output is passed to this command as input.
+        self.upstream = None
+        # Number of invocations on the command line this command runs, more than one when
+        # the chain optimizer merged or dropped the adjacent invocations.
+        self.invocations = 1
+        # Errors of the failed shards of a sharded command, by shard position.
+        self.shard_errors = {}
+        # `CapturedStream`s of the command's stdout and stderr, when output is captured.
+        self.stdout = None
+        self.stderr = None
+
+    def reset(self):
+        """Clears the results of a run so the command can run again."""
+        self.output = None
+        self.status = InvokedCommand.PENDING
+        self.error = None
+        self.cached = False
+        self.resumed = False
+        self.attempts = 0
+        self.duration = None
+        self.shard_errors = {}
+        self.stdout = None
+        self.stderr = None
 
     def instantiate(self, cmd_class, args):
         self.args = args
         self.instance = cmd_class(self.args)
 
+    @property
+    def is_async(self):
+        """True if the command is awaited on the event loop instead of run in a thread."""
+        return (
+            iscoroutinefunction(self.instance.run)
+            and not self.instance.isolated
+            and not self.instance.shard_argument
+        )
+
+    def upstream_output(self):
+        """Returns the output of the upstream command, or None if there is no upstream."""
+        if self.upstream is None:
+            return None
+        return self.upstream.output
+
     def __repr__(self):
         return "InvokedCommand(key=%s, type=%s, args=%s)" % (
             self.key,
@@ -0,0 +1,317 @@
+import sys
+from argparse import Namespace
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from inspect import iscoroutinefunction, isgenerator
+from io import StringIO
+from os import cpu_count
+from threading import Lock
+
+from .output import capturing_output
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - resource limits are only available on Unix
+    resource = None
+
+
+def materialize(output):
+    """Returns an output that can be sent between processes, consuming generators into lists."""
+    if isgenerator(output):
+        return list(output)
+    return output
+
+
+def run_isolated_command(
+    command_class,
+    parsed_args,
+    command_input,
+    cpu_time_limit,
+    memory_limit,
+    capture_output=False,
+):
+    """Runs a command in a worker process and returns its output.
+
+    Args:
+        command_class: Class of the command to run.
+        parsed_args: Parsed arguments the command is instantiated with.
+        command_input: Input of the command.
+        cpu_time_limit: Seconds of CPU time the command may use, or None.
+        memory_limit: Bytes of address space the worker may use while running, or None.
+        capture_output: Return the text the command wrote to stdout and stderr with its
+          output, as a tuple of the output, stdout and stderr.
+    """
+    previous_limits = _set_limits(cpu_time_limit, memory_limit)
+    try:
+        instance = command_class(parsed_args)
+        instance.input = command_input
+        if not capture_output:
+            return _run_instance(instance)
+        stdout, stderr = StringIO(), StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            output = _run_instance(instance)
+        return output, stdout.getvalue(), stderr.getvalue()
+    finally:
+        for limit, value in previous_limits.items():
+            resource.setrlimit(limit, value)
+
+
+def _run_instance(instance):
+    if iscoroutinefunction(instance.run):
+        import asyncio
+
+        output = asyncio.run(instance.run())
+    else:
+        output = instance.run()
+    return materialize(output)
+
+
+def _replay_output(result):
+    """Writes the captured output of a worker to the current stdout and stderr."""
+    output, stdout, stderr = result
+    if stdout:
+        sys.stdout.write(stdout)
+    if stderr:
+        sys.stderr.write(stderr)
+    return output
+
+
+def shard_arguments(command_class, parsed_args, workers):
+    """Splits parsed arguments into one namespace per shard of the command's shard argument.
+
+    Args:
+        command_class: Command class whose `shard_argument` and `shard_size` are used.
+        parsed_args: Namespace returned by the command's parser.
+        workers: Number of worker processes.  Values are spread evenly over this many shards
+          when the command has no `shard_size`.
+
+    Returns:
+        A list of namespaces, each holding a contiguous slice of the shard argument's values.
+    """
+    name = command_class.shard_argument
+    values = getattr(parsed_args, name, None)
+    if not isinstance(values, list) or not values:
+        return [parsed_args]
+
+    size = command_class.shard_size or -(-len(values) // max(1, workers))
+    shards = []
+    for start in range(0, len(values), size):
+        shard = Namespace(**vars(parsed_args))
+        setattr(shard, name, values[start : start + size])
+        shards.append(shard)
+    return shards
+
+
+def _set_limits(cpu_time_limit, memory_limit):
+    """Lowers the worker's resource limits and returns the previous limits."""
+    previous_limits = {}
+    if resource is None:
+        return previous_limits
+
+    if cpu_time_limit is not None:
+        # RLIMIT_CPU counts the CPU time of the whole worker, so add the time already used.
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = usage.ru_utime + usage.ru_stime
+        previous_limits[resource.RLIMIT_CPU] = resource.getrlimit(resource.RLIMIT_CPU)
+        _lower_limit(resource.RLIMIT_CPU, int(used + cpu_time_limit) + 1)
+
+    if memory_limit is not None:
+        previous_limits[resource.RLIMIT_AS] = resource.getrlimit(resource.RLIMIT_AS)
+        _lower_limit(resource.RLIMIT_AS, memory_limit)
+
+    return previous_limits
+
+
+def _lower_limit(limit, value):
+    soft, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, hard))
+
+
+def _kill(executor):
+    """Stops a worker pool, killing workers that are still running commands."""
+    # The executor has no public API to stop running work, so its workers are terminated.
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False)
+
+
+class IsolatedRunner:
+    """Runs isolated commands in a reusable pool of worker processes.
+
+    The pool is started by the first isolated command and restarted if a worker dies.
+    Commands with a timeout or a CPU time limit may have their worker killed, so they run in
+    a pool of their own and never take down the commands sharing the pool.
+    """
+
+    def __init__(self, max_workers=None):
+        """Creates a runner.
+
+        Args:
+            max_workers: Number of worker processes.  Defaults to the number of CPUs.
+        """
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def workers(self):
+        """Number of worker processes of the pool."""
+        return self.max_workers or cpu_count() or 1
+
+    @property
+    def executor(self):
+        # Imported on first use to keep multiprocessing out of the startup path.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, function, *args):
+        """Submits a function to the worker pool and returns its future."""
+        return self.executor.submit(function, *args)
+
+    def run(self, cmd, timeout=None):
+        """Runs an invoked command in a worker process and returns its output.
+
+        Args:
+            cmd: Invoked command to run.
+            timeout: Seconds to wait for the command, or None to wait until it finishes.
+
+        Raises:
+            TimeoutError: If the command ran longer than the timeout.
+        """
+        command_class = type(cmd.instance)
+        capture_output = capturing_output()
+        with self._pool(command_class, timeout) as executor:
+            future = executor.submit(
+                run_isolated_command,
+                command_class,
+                cmd.args,
+                materialize(cmd.instance.input),
+                command_class.cpu_time_limit,
+                command_class.memory_limit,
+                capture_output,
+            )
+            result = self.result(future, timeout, cmd.key)
+        return _replay_output(result) if capture_output else result
+
+    def run_shards(self, cmd, shards, ordered=True, timeout=None):
+        """Runs each shard of an invoked command in a worker process.
+
+        Every shard runs to completion, even when other shards fail.
+
+        Args:
+            cmd: Invoked command to run.
+            shards: Parsed arguments of each shard, from `shard_arguments`.
+            ordered: Return the outputs in shard order.  Otherwise outputs are returned in the
+              order the shards finished.
+            timeout: Seconds to wait for all the shards, or None to wait until they finish.
+
+        Returns:
+            The outputs of the shards that succeeded, and a dict of the errors of the shards
+            that failed by shard position.
+
+        Raises:
+            TimeoutError: If the shards ran longer than the timeout.
+        """
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+        from concurrent.futures import as_completed
+        from concurrent.futures.process import BrokenProcessPool
+
+        command_class = type(cmd.instance)
+        command_input = materialize(cmd.instance.input)
+        capture_output = capturing_output()
+        outputs = []
+        errors = {}
+        with self._pool(command_class, timeout, len(shards)) as executor:
+            futures = {
+                executor.submit(
+                    run_isolated_command,
+                    command_class,
+                    shard_args,
+                    command_input,
+                    command_class.cpu_time_limit,
+                    command_class.memory_limit,
+                    capture_output,
+                ): position
+                for position, shard_args in enumerate(shards)
+            }
+            try:
+                for future in as_completed(futures, timeout):
+                    try:
+                        result = future.result()
+                        if capture_output:
+                            result = _replay_output(result)
+                        outputs.append((futures[future], result))
+                    except Exception as e:
+                        errors[futures[future]] = e
+            except FutureTimeoutError:
+                raise TimeoutError(
+                    "Command %s timed out after %s seconds" % (cmd.key, timeout)
+                ) from None
+            if any(isinstance(e, BrokenProcessPool) for e in errors.values()):
+                self._discard(executor)
+
+        if ordered:
+            outputs.sort(key=lambda item: item[0])
+        return [output for _, output in outputs], errors
+
+    def result(self, future, timeout, key):
+        """Waits for a future of the pool.
+
+        Raises:
+            TimeoutError: If the future did not complete in time.
+        """
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(
+                "Command %s timed out after %s seconds" % (key, timeout)
+            ) from None
+
+    @contextmanager
+    def _pool(self, command_class, timeout, workers=1):
+        """Yields the pool to run a command in.
+
+        Commands that may be killed get a dedicated pool of `workers` processes, which is
+        killed if the command fails or times out.  Other commands use the shared pool, which
+        is discarded if one of its workers died.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        if timeout is None and command_class.cpu_time_limit is None:
+            executor = self.executor
+            try:
+                yield executor
+            except BrokenProcessPool:
+                self._discard(executor)
+                raise
+            return
+
+        executor = ProcessPoolExecutor(max_workers=min(workers, self.workers))
+        try:
+            yield executor
+        except BaseException:
+            _kill(executor)
+            raise
+        executor.shutdown()
+
+    def _discard(self, executor):
+        """Kills a broken pool, so the next command starts a new shared pool."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        _kill(executor)
+
+    def shutdown(self):
+        """Stops the worker pool once the running commands finish."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
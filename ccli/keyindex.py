@@ -0,0 +1,111 @@
+class KeyTrie:
+    """Prefix tree of command keys.
+
+    Each key is stored with a value identifying its command, so aliases of the same command
+    (`seed`, `seed-db`) do not make a prefix ambiguous.
+    """
+
+    # Node entry holding the value of a key ending at that node.
+    _VALUE = ""
+
+    def __init__(self, keys=None):
+        """Creates a trie.
+
+        Args:
+            keys: Optional map of keys to values to insert.
+        """
+        self._root = {}
+        self._size = 0
+        if keys is not None:
+            for key, value in keys.items():
+                self.insert(key, value)
+
+    def insert(self, key, value):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        if KeyTrie._VALUE not in node:
+            self._size += 1
+        node[KeyTrie._VALUE] = value
+
+    def get(self, key, default=None):
+        node = self._find(key)
+        if node is None:
+            return default
+        return node.get(KeyTrie._VALUE, default)
+
+    def complete(self, prefix):
+        """Returns all keys starting with `prefix`."""
+        node = self._find(prefix)
+        if node is None:
+            return []
+        keys = []
+        stack = [(prefix, node)]
+        while stack:
+            key, node = stack.pop()
+            for char, child in node.items():
+                if char == KeyTrie._VALUE:
+                    keys.append(key)
+                else:
+                    stack.append((key + char, child))
+        return sorted(keys)
+
+    def unique_prefix(self, prefix):
+        """Returns the key an abbreviation stands for.
+
+        Returns the key itself when it is stored, the shortest completion when every completion
+        belongs to the same command, and None when the prefix is unknown or ambiguous.
+        """
+        keys = self.complete(prefix)
+        if prefix in keys:
+            return prefix
+        if len({self.get(key) for key in keys}) != 1:
+            return None
+        return min(keys, key=len)
+
+    def suggest(self, word, max_distance=2):
+        """Returns keys within `max_distance` edits of `word`, closest first.
+
+        The edit distance is computed one trie row at a time, so branches that can no longer
+        come within `max_distance` are never visited.
+        """
+        suggestions = []
+        first_row = list(range(len(word) + 1))
+        stack = [(char, child, "", first_row) for char, child in self._root.items()]
+        while stack:
+            char, node, key, previous_row = stack.pop()
+            if char == KeyTrie._VALUE:
+                if previous_row[-1] <= max_distance:
+                    suggestions.append((previous_row[-1], key))
+                continue
+
+            key += char
+            row = [previous_row[0] + 1]
+            for i, word_char in enumerate(word, 1):
+                row.append(
+                    min(
+                        row[i - 1] + 1,
+                        previous_row[i] + 1,
+                        previous_row[i - 1] + (word_char != char),
+                    )
+                )
+            if min(row) <= max_distance:
+                stack.extend(
+                    (child_char, child, key, row) for child_char, child in node.items()
+                )
+        return [key for _, key in sorted(suggestions)]
+
+    def _find(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, key):
+        node = self._find(key)
+        return node is not None and KeyTrie._VALUE in node
+
+    def __len__(self):
+        return self._size
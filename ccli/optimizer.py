@@ -0,0 +1,84 @@
+from argparse import Namespace
+
+
+def optimize_chain(invoked_commands, command_classes):
+    """Merges and removes adjacent invocations of commands that allow it.
+
+    Runs on parsed invoked commands, before they are instantiated.  An invocation is dropped
+    when the previous invocation is of the same `idempotent` command with equal arguments.
+    Invocations of a command with a `merge_argument` are merged into the previous invocation
+    of the same command when all their other arguments are equal, and the values of the merge
+    argument are joined in chain order.
+
+    Args:
+        invoked_commands: Invoked commands whose `args` hold their parsed arguments.
+        command_classes: Mapping of command keys to command classes.
+
+    Returns:
+        The optimized list of invoked commands.  Each command's `invocations` counts the
+        invocations of the command line it runs.
+    """
+    optimized = []
+    previous_class = None
+    for cmd in invoked_commands:
+        command_class = command_classes[cmd.key]
+        if optimized and command_class is previous_class:
+            previous = optimized[-1]
+            if command_class.idempotent and previous.args == cmd.args:
+                previous.invocations += cmd.invocations
+                continue
+            merged_args = _merge_args(command_class, previous.args, cmd.args)
+            if merged_args is not None:
+                previous.args = merged_args
+                previous.invocations += cmd.invocations
+                continue
+        optimized.append(cmd)
+        previous_class = command_class
+    return optimized
+
+
+def _merge_args(command_class, first, second):
+    """Returns the arguments of two merged invocations, or None if they cannot be merged."""
+    name = command_class.merge_argument
+    if (
+        not name
+        or not isinstance(first, Namespace)
+        or not isinstance(second, Namespace)
+    ):
+        return None
+    first_values = vars(first)
+    second_values = vars(second)
+    if not isinstance(first_values.get(name), list) or not isinstance(
+        second_values.get(name), list
+    ):
+        return None
+    if {k: v for k, v in first_values.items() if k != name} != {
+        k: v for k, v in second_values.items() if k != name
+    }:
+        return None
+
+    merged = Namespace(**first_values)
+    setattr(merged, name, first_values[name] + second_values[name])
+    return merged
+
+
+def format_plan(invoked_commands):
+    """Returns a table with the position, key, arguments and invocations of each command."""
+    rows = []
+    for position, cmd in enumerate(invoked_commands, 1):
+        if isinstance(cmd.args, Namespace):
+            args = " ".join("%s=%r" % item for item in sorted(vars(cmd.args).items()))
+        else:
+            args = repr(cmd.args)
+        invocations = ""
+        if cmd.invocations > 1:
+            invocations = "(%d invocations)" % cmd.invocations
+        rows.append(("%d." % position, cmd.key, args, invocations))
+
+    if not rows:
+        return "No commands to run."
+    widths = [max(len(row[i]) for row in rows) for i in range(3)]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths + [0])).rstrip()
+        for row in rows
+    )
@@ -0,0 +1,205 @@
+import sys
+from contextvars import ContextVar
+from threading import Lock
+
+# Capture of the command running in the current thread or task, None outside of commands.
+_current_capture = ContextVar("ccli_output_capture", default=None)
+
+_install_lock = Lock()
+_install_count = 0
+_original_streams = None
+
+
+def capturing_output():
+    """True if the output of the current command is captured."""
+    return _current_capture.get() is not None
+
+
+class CapturedStream:
+    """Text written by one command to stdout or stderr.
+
+    Text is kept in memory up to `buffer_size` characters and spilled to a temporary file
+    beyond that.
+    """
+
+    def __init__(self, buffer_size):
+        from tempfile import SpooledTemporaryFile
+
+        self._file = SpooledTemporaryFile(
+            max_size=buffer_size, mode="w+", encoding="utf8", newline=""
+        )
+        self._lock = Lock()
+
+    def write(self, text):
+        with self._lock:
+            return self._file.write(text)
+
+    def getvalue(self):
+        """Returns all the text written to the stream."""
+        with self._lock:
+            self._file.seek(0)
+            text = self._file.read()
+            self._file.seek(0, 2)
+            return text
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __repr__(self):
+        with self._lock:
+            return "CapturedStream(size=%d)" % self._file.tell()
+
+
+class _StreamProxy:
+    """Replaces sys.stdout or sys.stderr, sending writes of captured commands to their
+    streams and all other writes to the original stream."""
+
+    def __init__(self, name, original):
+        self._name = name
+        self._original = original
+
+    def write(self, text):
+        capture = _current_capture.get()
+        if capture is None:
+            return self._original.write(text)
+        return capture.write(self._name, text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if _current_capture.get() is None:
+            self._original.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._original, name)
+
+
+def _install():
+    """Replaces sys.stdout and sys.stderr with proxies and returns the original streams."""
+    global _install_count, _original_streams
+    with _install_lock:
+        if _install_count == 0:
+            _original_streams = (sys.stdout, sys.stderr)
+            sys.stdout = _StreamProxy("stdout", sys.stdout)
+            sys.stderr = _StreamProxy("stderr", sys.stderr)
+        _install_count += 1
+        return _original_streams
+
+
+def _uninstall():
+    global _install_count, _original_streams
+    with _install_lock:
+        _install_count -= 1
+        if _install_count == 0:
+            sys.stdout, sys.stderr = _original_streams
+            _original_streams = None
+
+
+class OutputMultiplexer:
+    """Captures the stdout and stderr of each invoked command while a chain runs.
+
+    Each command's output is stored on its invoked command as `stdout` and `stderr`
+    `CapturedStream`s.  In live mode, complete lines are also written as they are produced,
+    prefixed by the command's key.  In grouped mode, the output of each command is written
+    in one block once the chain has run, in the order the commands started.
+
+    Used as a context manager around the run of a chain.  Writes made outside of commands
+    are not captured.
+    """
+
+    LIVE = "live"
+    GROUPED = "grouped"
+    MODES = (LIVE, GROUPED)
+
+    def __init__(self, mode=LIVE, buffer_size=64 * 1024):
+        """Creates an output multiplexer.
+
+        Args:
+            mode: `live` or `grouped`.
+            buffer_size: Characters of each stream kept in memory before it is spilled to a
+              temporary file.
+        """
+        if mode not in OutputMultiplexer.MODES:
+            raise ValueError(
+                "Unknown output mode '%s', expected one of: %s"
+                % (mode, ", ".join(OutputMultiplexer.MODES))
+            )
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.captured = []
+        self._streams = None
+        self._lock = Lock()
+
+    def __enter__(self):
+        self._streams = _install()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _uninstall()
+        if self.mode == OutputMultiplexer.GROUPED:
+            for cmd in self.captured:
+                self._write_group(cmd)
+        for stream in self._streams:
+            stream.flush()
+
+    def capture(self, cmd):
+        """Returns a context manager capturing the output of an invoked command."""
+        cmd.stdout = CapturedStream(self.buffer_size)
+        cmd.stderr = CapturedStream(self.buffer_size)
+        with self._lock:
+            self.captured.append(cmd)
+        return _CommandCapture(self, cmd)
+
+    def write_lines(self, name, key, text):
+        """Writes complete lines of a command to the original stream, prefixed by its key."""
+        stream = self._streams[0] if name == "stdout" else self._streams[1]
+        prefix = "[%s] " % key
+        block = "".join(prefix + line for line in text.splitlines(keepends=True))
+        with self._lock:
+            stream.write(block)
+
+    def _write_group(self, cmd):
+        for stream, captured in zip(self._streams, (cmd.stdout, cmd.stderr)):
+            text = captured.getvalue()
+            if not text:
+                continue
+            if not text.endswith("\n"):
+                text += "\n"
+            stream.write("==> %s <==\n%s" % (cmd.key, text))
+
+
+class _CommandCapture:
+    def __init__(self, multiplexer, cmd):
+        self.multiplexer = multiplexer
+        self.cmd = cmd
+        self.live = multiplexer.mode == OutputMultiplexer.LIVE
+        # Text after the last newline of each stream, written once its line is complete.
+        self._pending = {"stdout": "", "stderr": ""}
+        self._lock = Lock()
+        self._token = None
+
+    def write(self, name, text):
+        stream = self.cmd.stdout if name == "stdout" else self.cmd.stderr
+        stream.write(text)
+        if self.live:
+            with self._lock:
+                pending = self._pending[name] + text
+                end = pending.rfind("\n") + 1
+                self._pending[name] = pending[end:]
+            if end:
+                self.multiplexer.write_lines(name, self.cmd.key, pending[:end])
+        return len(text)
+
+    def __enter__(self):
+        self._token = _current_capture.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_capture.reset(self._token)
+        if self.live:
+            for name, pending in self._pending.items():
+                if pending:
+                    self.multiplexer.write_lines(name, self.cmd.key, pending + "\n")
@@ -0,0 +1,106 @@
+from contextvars import copy_context
+from threading import Thread
+
+
+class ExecutionPolicy:
+    """How a command is retried, timed out and whether its failure stops the chain.
+
+    Set as `policy` on a command class, or passed to the CCLI for every other command.
+
+        class Fetch(Command):
+            key = "fetch"
+            policy = ExecutionPolicy(retries=3, backoff=2, timeout=60)
+    """
+
+    def __init__(
+        self,
+        retries=0,
+        backoff=1.0,
+        backoff_factor=2.0,
+        retry_on=(Exception,),
+        continue_on_error=False,
+        timeout=None,
+    ):
+        """Creates an execution policy.
+
+        Args:
+            retries: Number of times a failed command is run again.
+            backoff: Seconds to wait before the first retry.
+            backoff_factor: Multiplier of the wait before each further retry.
+            retry_on: Exception types that are retried.  Defaults to all errors, including
+              timeouts.
+            continue_on_error: Run the rest of the chain when the command fails.  The error of
+              the first failed command is raised once the chain has run.
+            timeout: Seconds a command may run, unless the command sets its own `timeout`.
+              Commands that do not finish in time fail with `TimeoutError`.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.retry_on = tuple(retry_on)
+        self.continue_on_error = continue_on_error
+        self.timeout = timeout
+
+    def delay(self, attempt):
+        """Returns the seconds to wait after a failed attempt, counted from 1."""
+        return self.backoff * self.backoff_factor ** (attempt - 1)
+
+    def __repr__(self):
+        return "ExecutionPolicy(retries=%s, continue_on_error=%s, timeout=%s)" % (
+            self.retries,
+            self.continue_on_error,
+            self.timeout,
+        )
+
+
+def call_with_timeout(function, timeout, key):
+    """Calls a function, raising TimeoutError if it does not return in time.
+
+    Threads cannot be stopped, so a function that times out keeps running in a daemon thread
+    and its result is discarded.  The raised error has `still_running` set, so the function is
+    not retried while its previous call is running.  Isolated commands are stopped by killing
+    their worker instead.
+    """
+    if timeout is None:
+        return function()
+
+    result = {}
+
+    def target():
+        try:
+            result["value"] = function()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = Thread(target=copy_context().run, args=(target,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        error = TimeoutError("Command %s timed out after %s seconds" % (key, timeout))
+        error.still_running = True
+        raise error
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def format_status_report(invoked_commands):
+    """Returns a table with the status, attempts, duration and error of each command."""
+    rows = []
+    for cmd in invoked_commands:
+        duration = ""
+        if cmd.duration is not None:
+            duration = "%.3fs" % cmd.duration
+        error = ""
+        if cmd.error is not None:
+            error = "%s: %s" % (type(cmd.error).__name__, cmd.error)
+        attempts = ""
+        if cmd.attempts:
+            attempts = "%d attempt%s" % (cmd.attempts, "" if cmd.attempts == 1 else "s")
+        rows.append((cmd.key, cmd.status, attempts, duration, error))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(4)]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths + [0])).rstrip()
+        for row in rows
+    )
@@ -0,0 +1,174 @@
+import json
+import sys
+import tracemalloc
+from cProfile import Profile
+from os import makedirs, path
+from threading import Lock
+
+from .instrument import InstrumentationHook, Span
+
+
+class Profiler(InstrumentationHook):
+    """Records the wall time, CPU time and peak memory of each CCLI phase and command.
+
+    Enabled with the `--cli-profile[=FORMAT]` flag or by passing a profiler to the CCLI hooks.
+
+        profiler = Profiler("json")
+        CCLI(hooks=[profiler])
+        profiler.report()
+
+    Peak memory is the largest amount of memory allocated on top of what was in use when
+    the span started.  It is traced for the whole process, so it is approximate when commands
+    run concurrently.
+    """
+
+    FORMATS = ("table", "json", "pstats")
+
+    def __init__(self, output_format="table", stream=None, pstats_dir="."):
+        """Creates a profiler.
+
+        Args:
+            output_format: `table` or `json` to print a summary, or `pstats` to also write a
+              cProfile dump for each command to `pstats_dir`.
+            stream: Stream the summary is written to.  Defaults to stderr.
+            pstats_dir: Directory of the cProfile dumps.
+        """
+        if output_format not in Profiler.FORMATS:
+            raise ValueError(
+                "Unknown profile format '%s', expected one of: %s"
+                % (output_format, ", ".join(Profiler.FORMATS))
+            )
+        self.output_format = output_format
+        self.stream = stream
+        self.pstats_dir = pstats_dir
+        self.spans = []
+        self.pstats_files = []
+        self._open_spans = {}
+        self._profiles = {}
+        self._started_tracing = False
+        # Memory traced before tracing was restarted, on Python versions without reset_peak.
+        self._offset = 0
+        self._lock = Lock()
+
+    def span_started(self, span):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._record_peak()
+            self._reset_peak()
+            current = self._traced_memory()[0]
+            self._open_spans[id(span)] = (current, current)
+
+        if self.output_format == "pstats" and span.category == Span.COMMAND:
+            profile = Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Only one profiler can be active at a time on recent Python versions.
+                return
+            self._profiles[id(span)] = profile
+
+    def span_finished(self, span):
+        profile = self._profiles.pop(id(span), None)
+        if profile is not None:
+            profile.disable()
+            self._dump_stats(span, profile)
+
+        with self._lock:
+            self._record_peak()
+            start, peak = self._open_spans.pop(id(span))
+            span.peak_memory = peak - start
+            if not self._open_spans and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+                self._offset = 0
+            self.spans.append(span)
+
+    def _record_peak(self):
+        """Adds the peak memory since the last reset to every open span."""
+        if not tracemalloc.is_tracing():
+            return
+        peak = self._traced_memory()[1]
+        for span_id, (start, span_peak) in self._open_spans.items():
+            self._open_spans[span_id] = (start, max(span_peak, peak))
+
+    def _traced_memory(self):
+        """Returns the current and peak traced memory."""
+        current, peak = tracemalloc.get_traced_memory()
+        return current + self._offset, peak + self._offset
+
+    def _reset_peak(self):
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+            return
+        if not self._started_tracing:
+            # Tracing started by someone else is left alone, so the peak is not reset.
+            return
+        # Before Python 3.9 the peak is reset by restarting tracing.  Blocks allocated before
+        # the restart are no longer traced, so freeing them does not lower the current memory.
+        self._offset += tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+
+    def _dump_stats(self, span, profile):
+        makedirs(self.pstats_dir, exist_ok=True)
+        file_name = "ccli-%s-%s.pstats" % (
+            span.attributes.get("position"),
+            span.attributes.get("key", span.name),
+        )
+        file_path = path.join(self.pstats_dir, file_name)
+        profile.dump_stats(file_path)
+        self.pstats_files.append(file_path)
+
+    def summary(self):
+        """Returns a list with a dictionary of measurements for each finished span."""
+        return [
+            {
+                "name": span.name,
+                "category": span.category,
+                "attributes": {
+                    key: str(value) for key, value in span.attributes.items()
+                },
+                "wall_time": span.wall_time,
+                "cpu_time": span.cpu_time,
+                "peak_memory": span.peak_memory,
+                "failed": span.error is not None,
+            }
+            for span in sorted(self.spans, key=lambda s: s.start_time)
+        ]
+
+    def report(self):
+        """Writes the summary to the stream in the profiler's format."""
+        stream = self.stream if self.stream is not None else sys.stderr
+        summary = self.summary()
+
+        if self.output_format == "json":
+            json.dump(summary, stream, indent=2)
+            stream.write("\n")
+            return
+
+        rows = [("Span", "Wall ms", "CPU ms", "Peak KiB")]
+        for record in summary:
+            name = record["name"]
+            if "key" in record["attributes"]:
+                name = "%s %s" % (name, record["attributes"]["key"])
+            rows.append(
+                (
+                    name,
+                    "%.3f" % (record["wall_time"] * 1000),
+                    "%.3f" % (record["cpu_time"] * 1000),
+                    "%.1f" % (record["peak_memory"] / 1024),
+                )
+            )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        for row in rows:
+            stream.write(
+                "  ".join(
+                    [row[0].ljust(widths[0])]
+                    + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+                )
+                + "\n"
+            )
+        for file_path in self.pstats_files:
+            stream.write("Profile written to %s\n" % file_path)
@@ -0,0 +1,102 @@
+from collections.abc import Mapping
+from importlib import import_module
+
+
+class CommandRegistry(Mapping):
+    """Map of command keys to command classes that are only imported when they are used.
+
+    Commands are registered with a `module:Class` import path so the CCLI can resolve
+    arguments and generate help text without importing every command module.
+
+        registry = CommandRegistry()
+        registry.add("project.server:StartServer", ["start", "s"], "Start the server.")
+        CCLI(command_registry=registry)
+    """
+
+    # Entry point group searched by `from_entry_points`.
+    ENTRY_POINT_GROUP = "ccli.commands"
+
+    def __init__(self):
+        self._targets = {}
+        self._descriptions = {}
+        self._classes = {}
+
+    def add(self, target, keys, description=None):
+        """Registers a command.
+
+        Args:
+            target: Import path of the command class, formatted as `module:Class`.
+            keys: Keys the command is invoked with.
+            description: Help text shown for the command.
+        """
+        for key in keys:
+            self._targets[key] = target
+        if description is not None:
+            self._descriptions[target] = description
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        """Creates a registry from a manifest.
+
+        Args:
+            manifest: Path to a JSON file or an already loaded dictionary formatted as
+              `{"commands": [{"target": "module:Class", "keys": [...], "description": ""}]}`.
+        """
+        if not isinstance(manifest, Mapping):
+            import json
+
+            with open(manifest, encoding="utf8") as f:
+                manifest = json.load(f)
+
+        registry = cls()
+        for command in manifest["commands"]:
+            registry.add(command["target"], command["keys"], command.get("description"))
+        return registry
+
+    @classmethod
+    def from_entry_points(cls, group=ENTRY_POINT_GROUP):
+        """Creates a registry from installed package entry points.
+
+        Each entry point name is a command key and its value the command import path.
+        """
+        from importlib.metadata import entry_points
+
+        registry = cls()
+        for entry_point in entry_points(group=group):
+            registry.add(entry_point.value, [entry_point.name])
+        return registry
+
+    def target(self, key):
+        """Returns the import path registered for a key."""
+        return self._targets[key]
+
+    def description(self, key):
+        """Returns the stored help text for a key without importing the command."""
+        return self._descriptions.get(self._targets[key])
+
+    def groups(self):
+        """Returns a map of import paths to their keys, in registration order."""
+        groups = {}
+        for key, target in self._targets.items():
+            groups.setdefault(target, []).append(key)
+        return groups
+
+    def __getitem__(self, key):
+        target = self._targets[key]
+        command_class = self._classes.get(target)
+        if command_class is None:
+            module_name, _, class_name = target.partition(":")
+            command_class = import_module(module_name)
+            for name in class_name.split("."):
+                command_class = getattr(command_class, name)
+            self._classes[target] = command_class
+        return command_class
+
+    def __contains__(self, key):
+        return key in self._targets
+
+    def __iter__(self):
+        return iter(self._targets)
+
+    def __len__(self):
+        return len(self._targets)
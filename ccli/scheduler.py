@@ -0,0 +1,153 @@
+from contextvars import copy_context
+
+from .invokedcommand import InvokedCommand
+
+
+def build_dependencies(command_classes, available_commands, concurrent=True):
+    """Builds the dependency graph of an invoked command chain.
+
+    Command `i` depends on an earlier command `j` when either command cannot run
+    concurrently, or when `j` is one of the commands listed in `i`'s `after` keys.
+    Without concurrency every command depends on all the commands before it.
+
+    Args:
+        command_classes: Command class of each invoked command, in chain order.
+        available_commands: Map of command keys to command classes.
+        concurrent: Allow commands marked as concurrent to overlap.
+
+    Returns:
+        A list with the set of indexes each invoked command must wait for.
+    """
+    dependencies = []
+    for i, command_class in enumerate(command_classes):
+        after = {
+            available_commands[key]
+            for key in command_class.after
+            if key in available_commands
+        }
+        dependencies.append(
+            {
+                j
+                for j, previous_class in enumerate(command_classes[:i])
+                if not concurrent
+                or not command_class.concurrent
+                or not previous_class.concurrent
+                or previous_class in after
+            }
+        )
+    return dependencies
+
+
+def run_threaded(invoked_commands, dependencies, run_command, max_workers=None):
+    """Runs invoked commands in a thread pool while honoring their dependencies.
+
+    Once a command fails no new commands are started, the running ones are allowed to
+    finish and everything left over is marked as skipped.
+
+    Args:
+        invoked_commands: Invoked commands in chain order.
+        dependencies: Dependency sets created by `build_dependencies`.
+        run_command: Callable running a single invoked command.
+        max_workers: Maximum number of threads. Defaults to the executor's default.
+    """
+    # Imported here to keep concurrent.futures out of the startup path of serial chains.
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    pending = list(range(len(invoked_commands)))
+    finished = set()
+    running = {}
+    failed = False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if not failed:
+                for i in [i for i in pending if dependencies[i] <= finished]:
+                    pending.remove(i)
+                    # Commands run in a copy of the context so they see the open spans.
+                    future = executor.submit(
+                        copy_context().run, run_command, invoked_commands[i]
+                    )
+                    running[future] = i
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                if future.exception() is None:
+                    finished.add(i)
+                else:
+                    failed = True
+
+    for i in pending:
+        invoked_commands[i].status = InvokedCommand.SKIPPED
+
+    raise_first_error(invoked_commands)
+
+
+def run_async(
+    invoked_commands,
+    dependencies,
+    run_command,
+    run_command_async,
+    max_workers=None,
+):
+    """Runs invoked commands on a single event loop while honoring their dependencies.
+
+    Commands with an `async def run` are awaited on the loop, synchronous commands are
+    offloaded to a thread pool so they do not block the coroutine commands.
+
+    Args:
+        invoked_commands: Invoked commands in chain order.
+        dependencies: Dependency sets created by `build_dependencies`.
+        run_command: Callable running a single synchronous invoked command.
+        run_command_async: Coroutine function running a single async invoked command.
+        max_workers: Maximum number of threads for synchronous commands.
+    """
+    # Imported here to keep asyncio out of the startup path of synchronous CLIs.
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        tasks = []
+        failed = False
+
+        async def run(i):
+            nonlocal failed
+            cmd = invoked_commands[i]
+            if dependencies[i]:
+                await asyncio.wait([tasks[j] for j in dependencies[i]])
+            if failed:
+                cmd.status = InvokedCommand.SKIPPED
+                return
+
+            try:
+                if cmd.is_async:
+                    await run_command_async(cmd)
+                else:
+                    await loop.run_in_executor(
+                        executor, copy_context().run, run_command, cmd
+                    )
+            except BaseException:
+                # The error is recorded on the invoked command and raised after the loop.
+                failed = True
+
+        for i in range(len(invoked_commands)):
+            tasks.append(loop.create_task(run(i)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            executor.shutdown()
+
+    asyncio.run(run_all())
+    raise_first_error(invoked_commands)
+
+
+def raise_first_error(invoked_commands):
+    """Re-raises the error of the first failed command in chain order, if any."""
+    for cmd in invoked_commands:
+        if cmd.status == InvokedCommand.FAILED:
+            raise cmd.error
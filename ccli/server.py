@@ -0,0 +1,70 @@
+import os
+import sys
+import traceback
+from socketserver import BaseRequestHandler, ForkingMixIn, UnixStreamServer
+
+from .client import EXIT_CODE, recv_fds, recv_frame
+
+
+class CCLIRequestHandler(BaseRequestHandler):
+    """Runs one forwarded command line in a forked worker process.
+
+    The worker takes over the client's stdio, working directory and environment, so commands
+    behave as if they were started by the client.
+    """
+
+    def handle(self):
+        fds = recv_fds(self.request, 3)
+        request = recv_frame(self.request)
+
+        for target, fd in zip((0, 1, 2), fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+
+        result = self.server.cli.dispatch(request["args"])
+        if result.error is not None and not isinstance(result.error, SystemExit):
+            traceback.print_exception(
+                type(result.error), result.error, result.error.__traceback__
+            )
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.request.sendall(EXIT_CODE.pack(result.exit_code))
+
+
+class CCLIServer(ForkingMixIn, UnixStreamServer):
+    """Keeps a CCLI loaded and runs command lines sent by `ccli.client`.
+
+    Each command chain runs in a process forked from the server, so the available commands,
+    parsers and imported modules are already loaded and a failing command cannot affect the
+    server.
+
+        cli = CCLI(auto_run=False)
+        CCLIServer(cli, "/tmp/project.sock").serve_forever()
+    """
+
+    def __init__(self, cli, socket_path):
+        """Creates a server listening on a Unix socket.
+
+        Args:
+            cli: CCLI created with `auto_run=False`.
+            socket_path: Path of the Unix socket.  An existing socket file is replaced.
+        """
+        self.cli = cli
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, CCLIRequestHandler)
+
+    def process_request(self, request, client_address):
+        # Unflushed output would be written again by the forked worker.
+        sys.stdout.flush()
+        sys.stderr.flush()
+        super().process_request(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
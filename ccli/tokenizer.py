@@ -0,0 +1,128 @@
+import sys
+from argparse import Namespace
+
+from .invokedcommand import InvokedCommand
+
+
+def tokenize(tokens, primary_command, match_command, chaining=True, skip_flag=None):
+    """Assigns command line tokens to invoked commands in a single pass.
+
+    Tokens are read one at a time, so `tokens` may be any iterable, including a generator
+    reading arguments from a file.  Tokens are appended to the arguments of the command they
+    belong to and are never copied into intermediate lists.
+
+    Args:
+        tokens: Arguments of the command chain, without the program name.
+        primary_command: Invoked command receiving the tokens before the first command.
+        match_command: Callable returning the command key a token invokes, or None.
+        chaining: Start a new command at every command key.  Otherwise every token after
+          the first command key belongs to that command.
+        skip_flag: Flag marking the next token as an argument instead of a command.
+
+    Yields:
+        Each invoked command as soon as its key is read.  Its arguments keep growing until
+        the next command is yielded.
+    """
+    tokens = iter(tokens)
+    current_command = primary_command
+    skip_command = False
+
+    for token in tokens:
+        if token == skip_flag:
+            skip_command = True
+            continue
+
+        key = None if skip_command else match_command(token)
+        skip_command = False
+        if key is None:
+            current_command.args.append(token)
+            continue
+
+        current_command = InvokedCommand(key)
+        yield current_command
+        if not chaining:
+            # In single mode, the rest of the tokens are arguments of the command.
+            current_command.args.extend(tokens)
+
+
+def expand_argfiles(tokens, prefix="@"):
+    """Replaces `@file` tokens with the arguments read from the file.
+
+    `@-` reads the arguments from stdin.  Files hold one argument per line, or arguments
+    separated by NUL characters as written by `find -print0`.
+
+    Args:
+        tokens: Iterable of command line tokens.
+        prefix: Prefix marking a token as the path of an argument file.
+
+    Yields:
+        The command line tokens with argument files expanded.
+    """
+    for token in tokens:
+        if not token.startswith(prefix) or token == prefix:
+            yield token
+            continue
+
+        file_path = token[len(prefix) :]
+        if file_path == "-":
+            yield from read_arguments(sys.stdin)
+        else:
+            with open(file_path, encoding="utf8") as f:
+                yield from read_arguments(f)
+
+
+def read_arguments(stream, block_size=64 * 1024):
+    """Reads arguments from a text stream without loading the whole stream.
+
+    Arguments are NUL separated if the first block of the stream contains a NUL character,
+    otherwise they are read one per line and blank lines are skipped.
+
+    Args:
+        stream: Text stream to read the arguments from.
+        block_size: Number of characters read at a time.
+    """
+    delimiter = None
+    pending = ""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        if delimiter is None:
+            delimiter = "\0" if "\0" in block else "\n"
+
+        *arguments, pending = (pending + block).split(delimiter)
+        for argument in arguments:
+            if delimiter == "\n":
+                argument = argument.rstrip("\r")
+                if not argument:
+                    continue
+            yield argument
+
+    if delimiter == "\n":
+        pending = pending.rstrip("\r")
+    if pending:
+        yield pending
+
+
+def chunk_arguments(command_class, parsed_args):
+    """Splits parsed arguments into one namespace per chunk of the command's chunk argument.
+
+    Args:
+        command_class: Command class whose `chunk_argument` and `chunk_size` are used.
+        parsed_args: Namespace returned by the command's parser.
+
+    Returns:
+        A list of namespaces, each holding at most `chunk_size` values of the chunk argument.
+    """
+    name = command_class.chunk_argument
+    values = getattr(parsed_args, name, None) if name else None
+    size = command_class.chunk_size
+    if not isinstance(values, list) or not size or len(values) <= size:
+        return [parsed_args]
+
+    chunks = []
+    for start in range(0, len(values), size):
+        chunk = Namespace(**vars(parsed_args))
+        setattr(chunk, name, values[start : start + size])
+        chunks.append(chunk)
+    return chunks
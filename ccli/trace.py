@@ -0,0 +1,174 @@
+import json
+from abc import ABC, abstractmethod
+from os import getpid
+from threading import Lock
+
+from .instrument import InstrumentationHook
+
+
+class SpanExporter(ABC):
+    """Base class for writing the spans of a command chain somewhere."""
+
+    @abstractmethod
+    def export(self, spans):
+        """Writes finished spans, ordered by start time."""
+
+
+class FileExporter(SpanExporter):
+    """Writes spans to a local JSON file.
+
+    The `chrome` format loads in `chrome://tracing` and Perfetto, the `otlp` format follows
+    the OpenTelemetry protocol's JSON encoding.
+    """
+
+    FORMATS = ("chrome", "otlp")
+
+    def __init__(self, file_path, output_format="chrome", service_name="ccli"):
+        """Creates a file exporter.
+
+        Args:
+            file_path: Path of the trace file, overwritten on each export.
+            output_format: `chrome` or `otlp`.
+            service_name: Service name of OTLP traces.
+        """
+        if output_format not in FileExporter.FORMATS:
+            raise ValueError(
+                "Unknown trace format '%s', expected one of: %s"
+                % (output_format, ", ".join(FileExporter.FORMATS))
+            )
+        self.file_path = file_path
+        self.output_format = output_format
+        self.service_name = service_name
+
+    def export(self, spans):
+        if self.output_format == "otlp":
+            trace = otlp_trace(spans, self.service_name)
+        else:
+            trace = chrome_trace(spans)
+        with open(self.file_path, "w", encoding="utf8") as f:
+            json.dump(trace, f)
+
+
+class Tracer(InstrumentationHook):
+    """Collects the spans of the CCLI phases and commands and passes them to exporters.
+
+    Enabled with the `--cli-trace[=FILE]` flag or by passing a tracer to the CCLI hooks.
+
+        tracer = Tracer([FileExporter("trace.json")])
+        CCLI(hooks=[tracer])
+        tracer.report()
+    """
+
+    def __init__(self, exporters):
+        """Creates a tracer.
+
+        Args:
+            exporters: List of `SpanExporter`s the spans are passed to by `report`.
+        """
+        self.exporters = list(exporters)
+        self.spans = []
+        self._lock = Lock()
+
+    def span_finished(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def report(self):
+        """Exports the collected spans and starts collecting a new trace."""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        spans.sort(key=lambda s: s.start_time)
+        for exporter in self.exporters:
+            exporter.export(spans)
+
+
+def chrome_trace(spans):
+    """Returns spans as a Chrome trace event document."""
+    pid = getpid()
+    events = []
+    for span in spans:
+        args = {key: _string(value) for key, value in span.attributes.items()}
+        if span.error is not None:
+            args["error"] = repr(span.error)
+        events.append(
+            {
+                "name": _display_name(span),
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_time * 1e6,
+                "dur": span.wall_time * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def otlp_trace(spans, service_name="ccli"):
+    """Returns spans as an OTLP JSON traces document."""
+    from . import __version__
+
+    otlp_spans = []
+    for span in spans:
+        attributes = [
+            {"key": "ccli.category", "value": {"stringValue": span.category}},
+            {"key": "ccli.cpu_time", "value": {"doubleValue": span.cpu_time}},
+        ]
+        for key, value in span.attributes.items():
+            if isinstance(value, int) and not isinstance(value, bool):
+                otlp_value = {"intValue": str(value)}
+            else:
+                otlp_value = {"stringValue": _string(value)}
+            attributes.append({"key": "ccli.%s" % key, "value": otlp_value})
+
+        start = int(span.start_time * 1e9)
+        status = {}
+        if span.error is not None:
+            # Status code 2 is STATUS_CODE_ERROR.
+            status = {"code": 2, "message": repr(span.error)}
+        otlp_spans.append(
+            {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": _display_name(span),
+                # Kind 1 is SPAN_KIND_INTERNAL.
+                "kind": 1,
+                "startTimeUnixNano": str(start),
+                "endTimeUnixNano": str(start + int(span.wall_time * 1e9)),
+                "attributes": attributes,
+                "status": status,
+            }
+        )
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": service_name},
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "ccli", "version": __version__},
+                        "spans": otlp_spans,
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def _display_name(span):
+    if "key" in span.attributes:
+        return "%s %s" % (span.name, span.attributes["key"])
+    return span.name
+
+
+def _string(value):
+    return value if isinstance(value, str) else repr(value)
@@ -0,0 +1,185 @@
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from os import path
+
+
+class Watcher(ABC):
+    """Base class for waiting until one of a set of files changes."""
+
+    def __init__(self, paths):
+        """Creates a watcher.
+
+        Args:
+            paths: Paths of the files to watch.  Files that do not exist yet are reported
+              once they are created.
+        """
+        self.paths = {path.abspath(file_path) for file_path in paths}
+
+    @abstractmethod
+    def read(self, timeout=None):
+        """Returns the watched paths that changed, waiting up to `timeout` seconds.
+
+        Returns an empty set if nothing changed in time.
+        """
+
+    def wait(self, debounce=0.1):
+        """Blocks until files change and returns the changed paths.
+
+        Changes are collected until no file has changed for `debounce` seconds, so a burst of
+        saves is returned at once.
+        """
+        changed = set()
+        while not changed:
+            changed |= self.read()
+        while True:
+            more = self.read(debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        """Releases the resources of the watcher."""
+
+
+class PollingWatcher(Watcher):
+    """Watches files by comparing their modification time and size at an interval."""
+
+    def __init__(self, paths, interval=0.25):
+        super().__init__(paths)
+        self.interval = interval
+        self._fingerprints = {
+            file_path: self._fingerprint(file_path) for file_path in self.paths
+        }
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for file_path, fingerprint in self._fingerprints.items():
+                current = self._fingerprint(file_path)
+                if current != fingerprint:
+                    self._fingerprints[file_path] = current
+                    changed.add(file_path)
+            if changed:
+                return changed
+
+            if deadline is None:
+                delay = self.interval
+            else:
+                delay = min(self.interval, deadline - time.monotonic())
+                if delay <= 0:
+                    return changed
+            time.sleep(delay)
+
+    @staticmethod
+    def _fingerprint(file_path):
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return None
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+
+class InotifyWatcher(Watcher):
+    """Watches files with Linux inotify, called through ctypes.
+
+    The directories of the files are watched so files replaced by editors that write a new
+    file and rename it are still reported.
+    """
+
+    # struct inotify_event without its variable length name.
+    EVENT = struct.Struct("iIII")
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, paths):
+        """Creates an inotify watcher.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        super().__init__(paths)
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(
+            InotifyWatcher.IN_NONBLOCK | InotifyWatcher.IN_CLOEXEC
+        )
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        mask = (
+            InotifyWatcher.IN_MODIFY
+            | InotifyWatcher.IN_ATTRIB
+            | InotifyWatcher.IN_CLOSE_WRITE
+            | InotifyWatcher.IN_MOVED_TO
+            | InotifyWatcher.IN_CREATE
+            | InotifyWatcher.IN_DELETE
+        )
+        self._directories = {}
+        for directory in {path.dirname(file_path) for file_path in self.paths}:
+            watch = libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+            if watch >= 0:
+                self._directories[watch] = directory
+
+    def read(self, timeout=None):
+        changed = set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not changed:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                break
+            changed |= self._read_events()
+        return changed
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            watch, _, _, length = InotifyWatcher.EVENT.unpack_from(data, offset)
+            offset += InotifyWatcher.EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._directories.get(watch)
+            if directory is None or not name:
+                continue
+            file_path = path.join(directory, os.fsdecode(name))
+            if file_path in self.paths:
+                changed.add(file_path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(paths):
+    """Returns an inotify watcher on Linux, or a polling watcher where inotify is unavailable."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            # AttributeError is raised when libc has no inotify functions.
+            pass
+    return PollingWatcher(paths)
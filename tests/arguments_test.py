@@ -0,0 +1,68 @@
+import pytest
+
+from ccli import CCLI, Argument, Command
+from ccli.completion import build_completion_index
+from tests.command_mock import CommandMock
+
+
+class Seed(Command):
+    key = "seed"
+    description = "Seed the database."
+    arguments = (
+        Argument("sql_file", nargs="+"),
+        Argument("--table", "-t", choices=["users", "orders"]),
+        Argument("--batch-size", type=int, default="100"),
+        Argument("--exclude", action="append"),
+        Argument("--verbose", "-v", action="count"),
+        Argument("--dry-run", action="store_true"),
+    )
+
+
+class TestArguments(CommandMock):
+    uses_commands = [Seed]
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ["a.sql"],
+            ["a.sql", "b.sql", "--table", "users", "-v", "-v"],
+            ["--table=orders", "--exclude", "x", "--exclude", "y", "a.sql"],
+            ["a.sql", "--batch-size", "5", "--dry-run"],
+            # Handled by the argparse fallback.
+            ["a.sql", "-vv", "--tab", "users"],
+        ],
+    )
+    def test_matches_argparse(self, args):
+        compiled = Seed.compiled_parser()
+        assert vars(compiled.parse_args(args)) == vars(compiled.parser.parse_args(args))
+
+    def test_fast_path(self):
+        compiled = Seed.compiled_parser()
+        namespace = compiled._parse(["a.sql", "-t", "users", "--batch-size=5"])
+        assert namespace.sql_file == ["a.sql"]
+        assert namespace.batch_size == 5
+        assert compiled._parse(["a.sql", "--table", "nope"]) is None
+
+    def test_errors_from_argparse(self, capsys):
+        with pytest.raises(SystemExit) as e:
+            CCLI(cli_args=["ccli", "seed", "a.sql", "--table", "nope"])
+        assert e.value.code == 2
+        assert "invalid choice: 'nope'" in capsys.readouterr().err
+
+    def test_help_and_completion(self, capsys):
+        with pytest.raises(SystemExit):
+            CCLI(cli_args=["ccli", "-h"])
+        assert "Seed the database." in capsys.readouterr().out
+
+        with pytest.raises(SystemExit):
+            CCLI(cli_args=["ccli", "-h", "seed"])
+        assert "--batch-size" in capsys.readouterr().out
+
+        index = build_completion_index({"seed": Seed})
+        assert index["commands"]["seed"]["choices"]["-t"] == ["users", "orders"]
+
+    def test_invalid_declarations(self):
+        with pytest.raises(ValueError):
+            Argument("--files", nargs="+")
+        with pytest.raises(ValueError):
+            Argument("--mode", action="store_const")
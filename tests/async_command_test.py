@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from ccli import CCLI, Command
+from tests.command_mock import CommandMock
+
+
+class Events:
+    calls = []
+
+
+class HealthCheck(Command):
+    key = "health"
+    concurrent = True
+
+    async def run(self):
+        Events.calls.append("health-start")
+        await asyncio.sleep(0.05)
+        Events.calls.append("health-end")
+
+
+class WarmCache(Command):
+    key = "warm"
+    concurrent = True
+
+    async def run(self):
+        Events.calls.append("warm-start")
+        await asyncio.sleep(0.05)
+        Events.calls.append("warm-end")
+
+
+class Migrate(Command):
+    key = "migrate"
+
+    def run(self):
+        Events.calls.append("migrate")
+
+
+class FailingCheck(Command):
+    key = "fail"
+
+    async def run(self):
+        raise ValueError("unhealthy")
+
+
+class TestAsyncCommands(CommandMock):
+    uses_commands = [HealthCheck, WarmCache, Migrate, FailingCheck]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_calls():
+        Events.calls = []
+
+    def test_sequential(self):
+        c = CCLI(cli_args=["ccli", "health", "warm", "migrate"])
+        assert Events.calls == [
+            "health-start",
+            "health-end",
+            "warm-start",
+            "warm-end",
+            "migrate",
+        ]
+        assert [cmd.status for cmd in c.invoked_commands] == ["succeeded"] * 3
+
+    def test_concurrent(self):
+        CCLI(cli_args=["ccli", "health", "warm", "migrate"], concurrent=True)
+        assert Events.calls[:2] == ["health-start", "warm-start"]
+        # Migrate is not concurrent so it waits for both async commands.
+        assert Events.calls[-1] == "migrate"
+
+    def test_failure(self):
+        with pytest.raises(ValueError):
+            CCLI(cli_args=["ccli", "fail", "migrate"])
+        assert Events.calls == []
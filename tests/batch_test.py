@@ -0,0 +1,74 @@
+from io import StringIO
+
+import pytest
+
+from ccli import CCLI, Command
+from tests.command_mock import CommandMock
+
+
+class Counter:
+    seeded = []
+
+
+class Seed(Command):
+    key = "seed"
+
+    @classmethod
+    def parse(cls, args_list):
+        return args_list
+
+    def run(self):
+        Counter.seeded.extend(self.args)
+
+
+class Fail(Command):
+    key = "fail"
+
+    def run(self):
+        raise RuntimeError("failed")
+
+
+class TestBatch(CommandMock):
+    uses_commands = [Seed, Fail]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_seeded():
+        Counter.seeded = []
+
+    def test_lines(self):
+        cli = CCLI(auto_run=False)
+        lines = StringIO(
+            "seed a.sql 'b c.sql'\n"
+            "# comment\n"
+            "\n"
+            "seed --cli-skip-command seed\n"
+            "fail\n"
+        )
+        results = cli.dispatch_batch(lines)
+        assert [r.line_number for r in results] == [1, 4, 5]
+        assert [r.result.exit_code for r in results] == [0, 0, 1]
+        assert Counter.seeded == ["a.sql", "b c.sql", "seed"]
+
+    def test_json_lines_concurrently(self):
+        cli = CCLI(auto_run=False)
+        lines = StringIO(
+            "".join('{"args": ["seed", "%d.sql"]}\n' % i for i in range(50))
+            + '["seed", "last.sql"]\n'
+        )
+        results = cli.dispatch_batch(lines, json_lines=True, max_workers=4)
+        assert all(r.result.ok for r in results)
+        assert len(Counter.seeded) == 51
+
+    def test_batch_flag(self, tmp_path, capsys):
+        batch_file = tmp_path / "commands.txt"
+        batch_file.write_text("seed a.sql\nfail\n")
+
+        with pytest.raises(SystemExit) as exit_info:
+            CCLI(cli_args=["ccli", "--cli-batch=%s" % batch_file])
+        assert exit_info.value.code == 1
+
+        report = capsys.readouterr().err
+        assert "line 1: exit 0: seed a.sql" in report
+        assert "line 2: exit 1: fail (RuntimeError: failed)" in report
+        assert "2 command lines, 1 failed" in report
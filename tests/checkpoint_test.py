@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.checkpoint import ChainCheckpoint
+from tests.command_mock import CommandMock
+
+# Keys of the commands that ran, in order.
+runs = []
+
+
+class Extract(Command):
+    key = "extract"
+
+    def run(self):
+        runs.append("extract")
+        return [1, 2, 3]
+
+
+class Stream(Command):
+    key = "stream"
+
+    def run(self):
+        runs.append("stream")
+        return (item * 10 for item in self.input)
+
+
+class Load(Command):
+    key = "load"
+    fail = False
+
+    def run(self):
+        runs.append("load")
+        if Load.fail:
+            raise RuntimeError("interrupted")
+        return sum(self.input)
+
+
+class TestCheckpoint(CommandMock):
+    uses_commands = [Extract, Stream, Load]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_runs():
+        del runs[:]
+        Load.fail = False
+
+    def dispatch(self, cache_dir, args):
+        return CCLI(auto_run=False, cache_dir=str(cache_dir), checkpoint=True).dispatch(
+            args
+        )
+
+    def test_resume_after_failure(self, tmp_path):
+        Load.fail = True
+        assert not self.dispatch(tmp_path, ["extract", "load"]).ok
+        assert runs == ["extract", "load"]
+
+        del runs[:]
+        Load.fail = False
+        result = self.dispatch(tmp_path, ["extract", "load", "--cli-resume"])
+        assert result.output == 6
+        assert runs == ["load"]
+        assert [cmd.resumed for cmd in result.invoked_commands] == [True, False]
+        assert os.listdir(str(tmp_path / "checkpoints")) == []
+
+    def test_unsaved_output_is_run_again(self, tmp_path):
+        Load.fail = True
+        self.dispatch(tmp_path, ["extract", "stream", "load"])
+
+        del runs[:]
+        Load.fail = False
+        result = self.dispatch(tmp_path, ["extract", "stream", "load", "--cli-resume"])
+        assert result.output == 60
+        # The generator output of stream could not be stored, so stream runs again.
+        assert runs == ["stream", "load"]
+
+    def test_different_chain_is_not_resumed(self, tmp_path):
+        Load.fail = True
+        self.dispatch(tmp_path, ["extract", "load"])
+        checkpoint = ChainCheckpoint("Chain CLI", ["Chain CLI", "extract", "load"])
+        assert checkpoint.fingerprint != (
+            ChainCheckpoint("Chain CLI", ["Chain CLI", "extract", "stream"]).fingerprint
+        )
+
+        del runs[:]
+        Load.fail = False
+        self.dispatch(tmp_path, ["extract", "stream", "load", "--cli-resume"])
+        assert runs == ["extract", "stream", "load"]
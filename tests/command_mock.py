@@ -1,5 +1,3 @@
-from unittest.mock import MagicMock
-
 from ccli import Command
 
 
@@ -9,4 +7,12 @@ class CommandMock:
         commands = cls.__dict__.get("uses_commands")
         if commands is not None:
             c = Command
-            c.__subclasses__ = MagicMock(return_value=commands)
+
+            # Only replace the direct subclasses of Command,
+            # so subclasses of the listed commands are still discovered.
+            def subclasses(command_class):
+                if command_class is Command:
+                    return list(commands)
+                return type.__subclasses__(command_class)
+
+            c.__subclasses__ = classmethod(subclasses)
@@ -0,0 +1,72 @@
+from argparse import ArgumentParser
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.completion import completion_script
+from tests.command_mock import CommandMock
+from tests.backend_project_commands import Primary, StartServer, SeedDatabase
+
+
+class Deploy(Command):
+    key = "deploy"
+    instantiated = False
+
+    parser = ArgumentParser(prog="Deploy")
+    parser.add_argument("--env", choices=["dev", "prod"])
+    parser.add_argument("--force", action="store_true")
+
+    def __init__(self, args):
+        super().__init__(args)
+        Deploy.instantiated = True
+
+
+def completions(capsys, words, **kwargs):
+    CCLI(cli_args=["ccli", "--cli-complete"] + words, **kwargs)
+    return capsys.readouterr().out.splitlines()
+
+
+class TestCompletion(CommandMock):
+    uses_commands = [Primary, StartServer, SeedDatabase, Deploy]
+
+    def test_keys(self, capsys):
+        assert completions(capsys, [""]) == [
+            "primary",
+            "start",
+            "s",
+            "seed",
+            "seed-db",
+            "deploy",
+        ]
+        assert completions(capsys, ["se"]) == ["seed", "seed-db"]
+        assert not Deploy.instantiated
+
+    def test_chained_options(self, capsys):
+        assert completions(capsys, ["start", "-d", "deploy", "--"]) == [
+            "--help",
+            "--env",
+            "--force",
+        ]
+        assert completions(capsys, ["deploy", "--env", ""]) == ["dev", "prod"]
+        assert completions(capsys, ["deploy", "--force", "st"]) == ["start"]
+
+    def test_primary_options(self, capsys):
+        words = ["--e"]
+        assert completions(capsys, words, primary_command_class=Primary) == ["--env"]
+
+    def test_no_chaining(self, capsys):
+        assert completions(capsys, ["seed", "s"], enable_chaining=False) == []
+
+    def test_cached_completion(self, capsys, tmp_path):
+        options = {"cache_index": True, "cache_dir": str(tmp_path)}
+        assert completions(capsys, ["dep"], **options) == ["deploy"]
+        # The second call is answered from the cached index.
+        c = CCLI(cli_args=["ccli", "--cli-complete", "deploy", "--e"], **options)
+        assert c.available_commands == {}
+        assert capsys.readouterr().out == "--env\n"
+
+    @pytest.mark.parametrize("shell", ["bash", "zsh", "fish"])
+    def test_scripts(self, shell):
+        script = completion_script(shell, "my-cli", CCLI.COMPLETE_FLAG)
+        assert "my-cli --cli-complete" in script
+        assert "_ccli_complete_my_cli" in script
@@ -0,0 +1,72 @@
+from threading import Barrier
+
+import pytest
+
+from ccli import CCLI, Command
+from tests.command_mock import CommandMock
+
+
+class Recorder:
+    calls = []
+    barrier = Barrier(2, timeout=5)
+
+    def run(self):
+        Recorder.calls.append(self.key)
+
+
+class Fetch(Recorder, Command):
+    key = "fetch"
+    concurrent = True
+
+    def run(self):
+        # Only passes if another command is waiting at the same time.
+        Recorder.barrier.wait()
+        super().run()
+
+
+class Compile(Fetch):
+    key = "compile"
+
+
+class Package(Recorder, Command):
+    key = "package"
+    after = ("fetch", "broken")
+    concurrent = True
+
+
+class Broken(Recorder, Command):
+    key = "broken"
+    concurrent = True
+
+    def run(self):
+        raise RuntimeError("broken")
+
+
+class TestConcurrent(CommandMock):
+    uses_commands = [Fetch, Compile, Package, Broken]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_calls():
+        Recorder.calls = []
+        Recorder.barrier.reset()
+
+    def test_independent_commands_overlap(self):
+        c = CCLI(cli_args=["ccli", "fetch", "compile"], concurrent=True)
+        assert sorted(Recorder.calls) == ["compile", "fetch"]
+        assert [cmd.status for cmd in c.invoked_commands] == ["succeeded"] * 2
+
+    def test_after_dependency(self):
+        CCLI(cli_args=["ccli", "package", "fetch", "compile"], concurrent=True)
+        # Package only depends on fetch commands before it in the chain.
+        assert len(Recorder.calls) == 3
+
+        Recorder.calls = []
+        Recorder.barrier.reset()
+        CCLI(cli_args=["ccli", "fetch", "compile", "package"], concurrent=True)
+        assert Recorder.calls[-1] == "package"
+
+    def test_failure_skips_dependents(self):
+        with pytest.raises(RuntimeError):
+            CCLI(cli_args=["ccli", "broken", "package"], concurrent=True)
+        assert Recorder.calls == []
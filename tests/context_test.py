@@ -0,0 +1,128 @@
+import threading
+import time
+from abc import ABC
+
+import pytest
+
+from ccli import CCLI, ChainContext, Command
+from tests.command_mock import CommandMock
+
+events = []
+
+
+class Pool:
+    created = 0
+
+    def __init__(self):
+        Pool.created += 1
+        # Slow creation so concurrent commands request the pool at the same time.
+        time.sleep(0.05)
+        events.append("open")
+
+    def close(self):
+        events.append("close")
+
+
+class DatabaseCommand(Command, ABC):
+    concurrent = True
+
+    def prepare(self, context):
+        events.append("prepare %s" % self.key)
+        context.register("db", Pool, teardown=Pool.close)
+
+    def run(self):
+        events.append("run %s" % self.key)
+        return self.context.get("db")
+
+
+class Seed(DatabaseCommand):
+    key = "seed"
+
+
+class CleanDb(DatabaseCommand):
+    key = "clean-db"
+
+
+class Fail(Command):
+    key = "fail"
+
+    def run(self):
+        self.context.get("db")
+        raise ValueError("failed")
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    events.clear()
+    Pool.created = 0
+
+
+class TestChainContext(CommandMock):
+    uses_commands = [DatabaseCommand, Fail]
+
+    def test_shared_resource(self):
+        cli = CCLI(cli_args=["ccli", "seed", "clean-db", "seed"])
+        outputs = [cmd.output for cmd in cli.invoked_commands]
+        assert outputs[0] is outputs[1] is outputs[2]
+        assert events == [
+            "prepare seed",
+            "prepare clean-db",
+            "prepare seed",
+            "run seed",
+            "open",
+            "run clean-db",
+            "run seed",
+            "close",
+        ]
+
+    def test_concurrent_commands_create_once(self):
+        cli = CCLI(cli_args=["ccli", "seed", "clean-db"], concurrent=True)
+        assert Pool.created == 1
+        assert cli.invoked_commands[0].output is cli.invoked_commands[1].output
+        assert events[-1] == "close"
+
+    def test_teardown_after_error(self):
+        with pytest.raises(ValueError):
+            CCLI(cli_args=["ccli", "seed", "fail"])
+        assert events[-1] == "close"
+
+    def test_unused_resource_not_created(self):
+        context = ChainContext()
+        context.register("db", Pool, teardown=Pool.close)
+        assert "db" in context
+        context.close()
+        assert Pool.created == 0
+        with pytest.raises(KeyError):
+            context.get("cache")
+
+    def test_teardown_order_and_errors(self):
+        closed = []
+
+        def broken(resource):
+            closed.append(resource)
+            raise OSError("teardown failed")
+
+        context = ChainContext()
+        context.register("first", lambda: "first", teardown=closed.append)
+        context.register("second", lambda: "second", teardown=broken)
+        context.register("first", lambda: "replaced")
+        assert context.get("first") == "first"
+        context.get("second")
+        with pytest.raises(OSError):
+            context.close()
+        assert closed == ["second", "first"]
+
+    def test_threads_get_one_instance(self):
+        context = ChainContext()
+        context.register("db", Pool)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(context.get("db")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert Pool.created == 1
+        assert all(result is results[0] for result in results)
@@ -0,0 +1,100 @@
+from abc import abstractmethod
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.keyindex import KeyTrie
+from tests.command_mock import CommandMock
+
+
+class DbCommand(Command):
+    """Abstract intermediate base class."""
+
+    @abstractmethod
+    def connect(self):
+        pass
+
+
+class Migrate(DbCommand):
+    key = "migrate"
+
+    def connect(self):
+        pass
+
+
+class Rollback(DbCommand):
+    key = "rollback"
+    short_key = "rb"
+
+    def connect(self):
+        pass
+
+
+class Start(Command):
+    key = "start"
+
+
+class Status(Command):
+    key = "status"
+    alt_key = "stat"
+
+
+class TestRecursiveDiscovery(CommandMock):
+    uses_commands = [DbCommand, Start, Status]
+
+    def test_nested_commands_are_found(self):
+        c = CCLI(cli_args=["ccli", "migrate", "rb"])
+        assert set(c.available_commands) == {
+            "migrate",
+            "rollback",
+            "rb",
+            "start",
+            "status",
+            "stat",
+        }
+        assert DbCommand not in c.available_commands.values()
+        assert [type(cmd.instance) for cmd in c.invoked_commands] == [
+            Migrate,
+            Rollback,
+        ]
+
+    def test_abbreviations(self):
+        c = CCLI(cli_args=["ccli", "mig", "star", "stat"], allow_abbrev=True)
+        assert [cmd.key for cmd in c.invoked_commands] == ["migrate", "start", "stat"]
+        # "sta" is ambiguous.
+        assert c.key_index.unique_prefix("sta") is None
+
+        c = CCLI(cli_args=["ccli", "mig"])
+        assert c.invoked_commands == []
+
+    def test_suggestions(self):
+        c = CCLI(cli_args=["ccli"])
+        assert c.suggest_commands("migrat") == ["migrate"]
+        assert c.suggest_commands("statsu") == ["stat", "status"]
+        assert c.suggest_commands("rolback") == ["rollback"]
+        assert c.suggest_commands("xyz") == []
+
+
+class Duplicate(Command):
+    key = "start"
+
+
+class TestKeyCollision(CommandMock):
+    uses_commands = [Start, Duplicate]
+
+    def test_collision(self):
+        with pytest.raises(ValueError):
+            CCLI(cli_args=["ccli"])
+
+
+class TestKeyTrie:
+    def test_prefixes(self):
+        trie = KeyTrie({"seed": 1, "seed-db": 1, "start": 2, "s": 2})
+        assert "seed" in trie
+        assert "see" not in trie
+        assert len(trie) == 4
+        assert trie.complete("se") == ["seed", "seed-db"]
+        assert trie.unique_prefix("se") == "seed"
+        assert trie.unique_prefix("st") == "start"
+        assert trie.unique_prefix("s") == "s"
+        assert trie.unique_prefix("x") is None
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ccli import CCLI, Command
+from tests.command_mock import CommandMock
+from tests.backend_project_commands import StartServer, SeedDatabase
+
+
+class Fail(Command):
+    key = "fail"
+
+    def run(self):
+        raise RuntimeError("failed")
+
+
+class Echo(Command):
+    key = "echo"
+
+    @classmethod
+    def parse(cls, args_list):
+        return args_list
+
+    def run(self):
+        return self.args
+
+
+class TestDispatch(CommandMock):
+    uses_commands = [StartServer, SeedDatabase, Fail, Echo]
+
+    def test_no_auto_run(self):
+        cli = CCLI(cli_args=["ccli", "start"], auto_run=False)
+        assert cli.invoked_commands == []
+        assert StartServer.run_count == 0
+
+    def test_repeated_dispatch(self):
+        cli = CCLI(auto_run=False)
+        first = cli.dispatch(["seed", "a.sql", "start", "-p", "80"])
+        second = cli.dispatch(["start"])
+
+        assert first.ok
+        assert len(first.invoked_commands) == 2
+        assert first.invoked_commands[1].instance.args.port == 80
+        assert second.invoked_commands[0].instance.args.port is None
+        assert cli.invoked_commands == []
+
+        StartServer.run_count = 0
+        SeedDatabase.run_count = 0
+
+    def test_errors_are_returned(self):
+        cli = CCLI(auto_run=False)
+
+        result = cli.dispatch(["fail"])
+        assert isinstance(result.error, RuntimeError)
+        assert result.exit_code == 1
+        assert result.invoked_commands[0].status == "failed"
+
+        # Argparse errors exit with code 2.
+        assert cli.dispatch(["start", "--port", "abc"]).exit_code == 2
+
+    def test_concurrent_dispatch(self):
+        cli = CCLI(auto_run=False)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda i: cli.dispatch(["echo", str(i)]), range(100))
+            )
+        assert [result.output for result in results] == [[str(i)] for i in range(100)]
+
+    def test_reserved_modes(self, capsys):
+        cli = CCLI(auto_run=False)
+
+        result = cli.dispatch(["--cli-complete", "ec"])
+        assert result.ok
+        assert result.invoked_commands == []
+        assert capsys.readouterr().out == "echo\n"
+
+        # Without input files the chain runs once and is not watched.
+        result = cli.dispatch(["--cli-watch", "echo", "1"])
+        assert result.output == ["1"]
+        assert "No input files to watch." in capsys.readouterr().err
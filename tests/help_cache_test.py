@@ -0,0 +1,38 @@
+import pytest
+
+from ccli import CCLI
+from tests.command_mock import CommandMock
+from tests.backend_project_commands import Primary, StartServer, SeedDatabase
+
+
+class TestHelpCache(CommandMock):
+    uses_commands = [Primary, StartServer, SeedDatabase]
+
+    def test_help_is_memoized(self):
+        cli = CCLI(primary_command_class=Primary, auto_run=False)
+        assert cli.help_text() is cli.help_text()
+        assert "seed,seed-db" in cli.help_text()
+        assert "seed,seed-db" not in cli.help_text("st*")
+
+        # Help can be shown more than once without modifying the primary parser.
+        assert cli.dispatch(["-h"]).exit_code == 0
+        assert cli.dispatch(["-h"]).exit_code == 0
+        assert Primary.parser.prog == "Primary Command"
+
+    def test_unknown_pattern(self, capsys):
+        cli = CCLI(auto_run=False)
+        assert cli.dispatch(["-h", "strat"]).exit_code == 2
+        assert "Did you mean: start?" in capsys.readouterr().err
+
+    def test_help_from_index_cache(self, tmp_path, capsys, monkeypatch):
+        options = {"cache_index": True, "cache_dir": str(tmp_path)}
+        CCLI(cli_args=["ccli"], **options)
+
+        def fail(self):
+            raise AssertionError("Commands should not be loaded")
+
+        monkeypatch.setattr(CCLI, "_build_command_map", fail)
+        monkeypatch.setattr(CCLI, "_build_help_parser", fail)
+        with pytest.raises(SystemExit):
+            CCLI(cli_args=["ccli", "-h"], **options)
+        assert "seed,seed-db" in capsys.readouterr().out
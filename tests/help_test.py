@@ -39,12 +39,22 @@ class TestHelpText:
 
         assert self.cli_name in output[self.first_line_idx]
 
+    def test_command_help(self):
+        output = self._run_script("./tests/backend_project_commands.py", "-h", "seed")
+
+        assert "usage: Database seed" in output[self.first_line_idx]
+
+    def test_filtered_help(self):
+        output = self._run_script("./tests/backend_project_commands.py", "-h", "s*")
+
+        assert "{start,s,seed,seed-db}" in output[self.first_line_idx]
+
     @staticmethod
-    def _run_script(script_path):
+    def _run_script(script_path, *args):
         env = environ.copy()
         env["PYTHONPATH"] = "."
 
-        cmd = ["python", script_path, "-h"]
+        cmd = ["python", script_path] + list(args or ["-h"])
         process = subprocess.run(cmd, capture_output=True, env=env)
 
         output = process.stdout.decode("utf-8").split("\n")
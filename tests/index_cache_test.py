@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+import pytest
+
+from ccli import CCLI, CommandRegistry
+from ccli.cache import CommandIndexCache
+from tests.command_mock import CommandMock
+from tests.backend_project_commands import StartServer, SeedDatabase
+
+
+class TestIndexCache(CommandMock):
+    uses_commands = [StartServer, SeedDatabase]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_run_count():
+        yield
+        StartServer.run_count = 0
+        SeedDatabase.run_count = 0
+
+    def make_cli(self, cache_dir, args):
+        return CCLI(
+            name="Index Cache",
+            cli_args=["ccli"] + args,
+            cache_index=True,
+            cache_dir=str(cache_dir),
+        )
+
+    def test_index_is_reused(self, tmp_path):
+        first = self.make_cli(tmp_path, ["start"])
+        assert not isinstance(first.available_commands, CommandRegistry)
+
+        second = self.make_cli(tmp_path, ["seed-db", "file.sql"])
+        assert isinstance(second.available_commands, CommandRegistry)
+        assert second.available_commands["s"] is StartServer
+        assert second.invoked_commands[0].instance.args.sql_file == ["file.sql"]
+        assert second.available_commands.description("seed") == (
+            "Seed the database from a SQL file or list of files."
+        )
+
+    def test_changed_script_invalidates_index(self, tmp_path, monkeypatch):
+        script = tmp_path / "cli.py"
+        script.write_text("from commands import *\n")
+        monkeypatch.setattr(sys, "argv", [str(script)])
+        self.make_cli(tmp_path, ["start"])
+        index_cache = CommandIndexCache("Index Cache", str(tmp_path))
+        assert index_cache.load() is not None
+
+        # The script now imports another command module.
+        script.write_text("from commands import *\nfrom more_commands import *\n")
+        mtime = os.stat(script).st_mtime_ns + 10**9
+        os.utime(script, ns=(mtime, mtime))
+        assert index_cache.load() is None
+
+    def test_changed_module_invalidates_index(self, tmp_path):
+        self.make_cli(tmp_path, ["start"])
+        index_cache = CommandIndexCache("Index Cache", str(tmp_path))
+
+        with open(index_cache.path, encoding="utf8") as f:
+            index = json.load(f)
+        for fingerprint in index["modules"].values():
+            fingerprint[0] -= 1
+        with open(index_cache.path, "w", encoding="utf8") as f:
+            json.dump(index, f)
+
+        assert index_cache.load() is None
+        c = self.make_cli(tmp_path, ["start"])
+        assert not isinstance(c.available_commands, CommandRegistry)
+        assert index_cache.load() is not None
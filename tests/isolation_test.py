@@ -0,0 +1,117 @@
+import os
+import time
+from argparse import ArgumentParser
+
+import pytest
+
+from ccli import CCLI, Command
+from tests.command_mock import CommandMock
+
+
+class Pid(Command):
+    key = "pid"
+    isolated = True
+
+    def run(self):
+        return os.getpid()
+
+
+class Square(Command):
+    key = "square"
+    isolated = True
+    parser = ArgumentParser()
+    parser.add_argument("numbers", type=int, nargs="*")
+
+    def run(self):
+        numbers = self.args.numbers or self.input
+        for number in numbers:
+            yield number * number
+
+
+class Total(Command):
+    key = "total"
+
+    def run(self):
+        return sum(self.input)
+
+
+class Sleep(Command):
+    key = "sleep"
+    isolated = True
+    timeout = 0.5
+
+    def run(self):
+        time.sleep(30)
+
+
+class Wait(Command):
+    key = "wait"
+    isolated = True
+    concurrent = True
+
+    def run(self):
+        time.sleep(1.5)
+        return "waited"
+
+
+class ConcurrentSleep(Sleep):
+    key = "concurrent-sleep"
+    concurrent = True
+
+
+class Allocate(Command):
+    key = "allocate"
+    isolated = True
+    memory_limit = 1024**3
+
+    def run(self):
+        return len(bytearray(2 * 1024**3))
+
+
+class TestIsolation(CommandMock):
+    uses_commands = [Pid, Square, Total, Sleep, Wait, Allocate]
+
+    def test_runs_in_worker_process(self):
+        c = CCLI(cli_args=["ccli", "pid"])
+        assert c.invoked_commands[0].output != os.getpid()
+
+    def test_generator_output_is_passed_on(self):
+        c = CCLI(cli_args=["ccli", "square", "1", "2", "3", "total"])
+        assert c.invoked_commands[0].output == [1, 4, 9]
+        assert c.invoked_commands[1].output == 14
+
+    def test_pool_is_reused_across_dispatches(self):
+        c = CCLI(auto_run=False, max_workers=1)
+        try:
+            first = c.dispatch(["pid"]).output
+            assert c.dispatch(["pid"]).output == first
+        finally:
+            c.close()
+
+    def test_timeout_restarts_pool(self):
+        c = CCLI(auto_run=False, max_workers=1)
+        try:
+            start = time.perf_counter()
+            result = c.dispatch(["sleep"])
+            assert time.perf_counter() - start < 10
+            assert isinstance(result.error, TimeoutError)
+            assert result.invoked_commands[0].status == "failed"
+            assert c.dispatch(["square", "2"]).output == [4]
+        finally:
+            c.close()
+
+    def test_timeout_does_not_kill_concurrent_commands(self):
+        c = CCLI(auto_run=False, concurrent=True, max_workers=2)
+        try:
+            result = c.dispatch(["wait", "concurrent-sleep"])
+            wait, sleep = result.invoked_commands
+            assert isinstance(result.error, TimeoutError)
+            assert wait.status == "succeeded"
+            assert wait.output == "waited"
+            assert isinstance(sleep.error, TimeoutError)
+        finally:
+            c.close()
+
+    def test_memory_limit(self):
+        with pytest.raises(MemoryError):
+            CCLI(cli_args=["ccli", "allocate"])
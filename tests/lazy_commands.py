@@ -0,0 +1,9 @@
+from ccli import Command
+
+
+class Report(Command):
+    key = "report"
+    run_count = 0
+
+    def run(self):
+        Report.run_count += 1
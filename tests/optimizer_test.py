@@ -0,0 +1,122 @@
+import pytest
+
+from ccli import CCLI, Argument, Command
+from tests.command_mock import CommandMock
+
+runs = []
+
+
+class Seed(Command):
+    key = "seed"
+    arguments = (Argument("sql_file", nargs="+"), Argument("--table"))
+    merge_argument = "sql_file"
+    chunk_argument = "sql_file"
+    chunk_size = 4
+
+    def run(self):
+        runs.append(("seed", self.args.sql_file, self.args.table))
+
+
+class Migrate(Command):
+    key = "migrate"
+    arguments = (Argument("version"),)
+    idempotent = True
+
+    def run(self):
+        runs.append(("migrate", self.args.version))
+
+
+class Notify(Command):
+    key = "notify"
+    arguments = (Argument("message"),)
+
+    def run(self):
+        runs.append(("notify", self.args.message))
+
+
+@pytest.fixture(autouse=True)
+def clear_runs():
+    runs.clear()
+
+
+class TestOptimizer(CommandMock):
+    uses_commands = [Seed, Migrate, Notify]
+
+    def test_merge_adjacent(self):
+        cli = CCLI(cli_args=["ccli", "seed", "a.sql", "seed", "b.sql", "seed", "c.sql"])
+        assert runs == [("seed", ["a.sql", "b.sql", "c.sql"], None)]
+        assert len(cli.invoked_commands) == 1
+        assert cli.invoked_commands[0].invocations == 3
+
+    def test_different_arguments_not_merged(self):
+        CCLI(
+            cli_args=[
+                "ccli",
+                "seed",
+                "a.sql",
+                "seed",
+                "b.sql",
+                "--table",
+                "users",
+                "notify",
+                "done",
+                "seed",
+                "c.sql",
+            ]
+        )
+        assert runs == [
+            ("seed", ["a.sql"], None),
+            ("seed", ["b.sql"], "users"),
+            ("notify", "done"),
+            ("seed", ["c.sql"], None),
+        ]
+
+    def test_merged_arguments_are_chunked(self):
+        CCLI(cli_args=["ccli", "seed", "1", "2", "3", "seed", "4", "5"])
+        assert runs == [("seed", ["1", "2", "3", "4"], None), ("seed", ["5"], None)]
+
+    def test_drop_idempotent_duplicates(self):
+        cli = CCLI(
+            cli_args=[
+                "ccli",
+                "migrate",
+                "3",
+                "migrate",
+                "3",
+                "migrate",
+                "4",
+                "notify",
+                "a",
+                "notify",
+                "a",
+            ]
+        )
+        assert runs == [
+            ("migrate", "3"),
+            ("migrate", "4"),
+            ("notify", "a"),
+            ("notify", "a"),
+        ]
+        assert [cmd.invocations for cmd in cli.invoked_commands] == [2, 1, 1, 1]
+
+    def test_disabled(self):
+        CCLI(cli_args=["ccli", "seed", "a", "seed", "b"], optimize=False)
+        assert runs == [("seed", ["a"], None), ("seed", ["b"], None)]
+
+    def test_plan(self, capsys):
+        cli = CCLI(
+            cli_args=["ccli", "seed", "a", "seed", "b", "migrate", "3", "--cli-plan"]
+        )
+        assert runs == []
+        assert all(cmd.instance is None for cmd in cli.invoked_commands)
+        lines = capsys.readouterr().out.splitlines()
+        assert lines == [
+            "1.  seed     sql_file=['a', 'b'] table=None  (2 invocations)",
+            "2.  migrate  version='3'",
+        ]
+
+    def test_dispatch(self):
+        cli = CCLI(auto_run=False)
+        result = cli.dispatch(["migrate", "1", "migrate", "1"])
+        assert result.ok
+        assert runs == [("migrate", "1")]
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import sys
+from threading import Barrier
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.output import CapturedStream, OutputMultiplexer
+from tests.command_mock import CommandMock
+
+
+class Chatty(Command):
+    key = "chatty"
+    concurrent = True
+    barrier = Barrier(2, timeout=5)
+
+    def run(self):
+        print("first")
+        # Both commands have written a line before either writes the second.
+        Chatty.barrier.wait()
+        print("second", end="")
+        sys.stderr.write("warning\n")
+        return "done"
+
+
+class Quiet(Chatty):
+    key = "quiet"
+
+
+class Ticker(Command):
+    key = "ticker"
+
+    async def run(self):
+        for i in range(2):
+            print("tick %d" % i)
+            await asyncio.sleep(0)
+
+
+class Worker(Command):
+    key = "worker"
+    isolated = True
+
+    def run(self):
+        print("from worker")
+
+
+@pytest.fixture(autouse=True)
+def reset_barrier():
+    Chatty.barrier.reset()
+
+
+class TestOutput(CommandMock):
+    uses_commands = [Chatty, Ticker, Worker]
+
+    def test_live(self, capsys):
+        c = CCLI(cli_args=["ccli", "chatty", "quiet", "--cli-output"], concurrent=True)
+        out, err = capsys.readouterr()
+        assert sorted(out.splitlines()) == [
+            "[chatty] first",
+            "[chatty] second",
+            "[quiet] first",
+            "[quiet] second",
+        ]
+        assert out.index("[chatty] first") < out.index("[chatty] second")
+        assert sorted(err.splitlines()) == ["[chatty] warning", "[quiet] warning"]
+        chatty = c.invoked_commands[0]
+        assert chatty.stdout.getvalue() == "first\nsecond"
+        assert chatty.stderr.getvalue() == "warning\n"
+        assert chatty.output == "done"
+
+    def test_grouped(self, capsys):
+        c = CCLI(
+            cli_args=["ccli", "chatty", "quiet"], concurrent=True, output_mode="grouped"
+        )
+        out, _ = capsys.readouterr()
+        first = c.invoked_commands[0].key
+        second = c.invoked_commands[1].key
+        if out.index(first) > out.index(second):
+            first, second = second, first
+        assert out == "==> %s <==\nfirst\nsecond\n==> %s <==\nfirst\nsecond\n" % (
+            first,
+            second,
+        )
+
+    def test_async_and_isolated(self, capsys, caplog):
+        # Live logging of the event loop's debug message would swap pytest's capture streams.
+        caplog.set_level(logging.INFO, logger="asyncio")
+        c = CCLI(cli_args=["ccli", "ticker", "worker", "--cli-output=grouped"])
+        out, _ = capsys.readouterr()
+        assert out == "==> ticker <==\ntick 0\ntick 1\n==> worker <==\nfrom worker\n"
+        assert c.invoked_commands[1].stdout.getvalue() == "from worker\n"
+
+    def test_not_captured_by_default(self, capsys):
+        c = CCLI(cli_args=["ccli", "ticker"])
+        assert capsys.readouterr().out == "tick 0\ntick 1\n"
+        assert c.invoked_commands[0].stdout is None
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            OutputMultiplexer("tail")
+
+    def test_stream_spills_to_file(self):
+        stream = CapturedStream(buffer_size=8)
+        stream.write("0123456789")
+        stream.write("abc")
+        assert stream.getvalue() == "0123456789abc"
+        assert stream._file._rolled
+        stream.close()
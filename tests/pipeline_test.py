@@ -0,0 +1,72 @@
+import pytest
+
+from ccli import CCLI, Command
+from tests.command_mock import CommandMock
+
+
+class Log:
+    events = []
+
+
+class Export(Command):
+    key = "export"
+
+    def run(self):
+        for i in range(3):
+            Log.events.append("export %d" % i)
+            yield i
+
+
+class Double(Command):
+    key = "double"
+
+    def run(self):
+        for item in self.input:
+            Log.events.append("double %d" % item)
+            yield item * 2
+
+
+class Load(Command):
+    key = "load"
+
+    def run(self):
+        return list(self.input)
+
+
+class Generate(Command):
+    key = "generate"
+
+    def run(self):
+        Log.events.append("generated")
+        yield
+
+
+class TestPipeline(CommandMock):
+    uses_commands = [Export, Double, Load, Generate]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_events():
+        Log.events = []
+
+    def test_streaming(self):
+        c = CCLI(cli_args=["ccli", "export", "double", "load"])
+        assert c.invoked_commands[-1].output == [0, 2, 4]
+        # Items flow through one at a time instead of stage by stage.
+        assert Log.events == [
+            "export 0",
+            "double 0",
+            "export 1",
+            "double 1",
+            "export 2",
+            "double 2",
+        ]
+
+    def test_unread_generators_are_drained(self):
+        CCLI(cli_args=["ccli", "generate"])
+        assert Log.events == ["generated"]
+
+    def test_lazy_output(self):
+        c = CCLI(cli_args=["ccli", "export", "double"], drain_output=False)
+        assert Log.events == []
+        assert list(c.invoked_commands[-1].output) == [0, 2, 4]
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from ccli import CCLI, Command, ExecutionPolicy
+from tests.command_mock import CommandMock
+
+
+class Flaky(Command):
+    key = "flaky"
+    policy = ExecutionPolicy(retries=2, backoff=0.01)
+    failures = 0
+
+    def run(self):
+        if Flaky.failures:
+            Flaky.failures -= 1
+            raise ConnectionError("network")
+        return "fetched"
+
+
+class Broken(Command):
+    key = "broken"
+    policy = ExecutionPolicy(continue_on_error=True)
+
+    def run(self):
+        raise RuntimeError("broken")
+
+
+class Report(Command):
+    key = "report"
+
+    def run(self):
+        return "input=%s" % self.input
+
+
+class Slow(Command):
+    key = "slow"
+    timeout = 0.1
+
+    def run(self):
+        time.sleep(5)
+
+
+class SlowRetried(Command):
+    key = "slow-retried"
+    policy = ExecutionPolicy(timeout=0.1, retries=3, backoff=0)
+    started = 0
+
+    def run(self):
+        SlowRetried.started += 1
+        time.sleep(0.5)
+
+
+class SlowAsync(Command):
+    key = "slow-async"
+    policy = ExecutionPolicy(timeout=0.1, retries=1, backoff=0)
+
+    async def run(self):
+        await asyncio.sleep(5)
+
+
+class TestPolicy(CommandMock):
+    uses_commands = [Flaky, Broken, Report, Slow, SlowRetried, SlowAsync]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_failures():
+        Flaky.failures = 0
+
+    def test_retry_with_backoff(self, capsys):
+        Flaky.failures = 2
+        c = CCLI(cli_args=["ccli", "flaky", "report"])
+        flaky = c.invoked_commands[0]
+        assert flaky.status == "succeeded"
+        assert flaky.attempts == 3
+        assert flaky.duration >= 0.03
+        assert "3 attempts" in capsys.readouterr().err
+
+    def test_retries_exhausted(self):
+        Flaky.failures = 3
+        with pytest.raises(ConnectionError):
+            CCLI(cli_args=["ccli", "flaky", "report"])
+
+    def test_continue_on_error(self, capsys):
+        result = CCLI(auto_run=False).dispatch(["broken", "report", "report"])
+        assert isinstance(result.error, RuntimeError)
+        assert [cmd.status for cmd in result.invoked_commands] == [
+            "failed",
+            "succeeded",
+            "succeeded",
+        ]
+        assert result.invoked_commands[1].output == "input=None"
+        assert "RuntimeError: broken" in capsys.readouterr().err
+
+    def test_fail_fast_skips_rest(self):
+        result = CCLI(
+            auto_run=False, policy=ExecutionPolicy(continue_on_error=False)
+        ).dispatch(["slow", "report"])
+        assert isinstance(result.error, TimeoutError)
+        assert [cmd.status for cmd in result.invoked_commands] == [
+            "failed",
+            "skipped",
+        ]
+
+    def test_async_timeout_is_retried(self):
+        result = CCLI(auto_run=False).dispatch(["slow-async"])
+        assert isinstance(result.error, TimeoutError)
+        assert result.invoked_commands[0].attempts == 2
+
+    def test_sync_timeout_is_not_retried(self):
+        SlowRetried.started = 0
+        result = CCLI(auto_run=False).dispatch(["slow-retried"])
+        assert isinstance(result.error, TimeoutError)
+        assert result.invoked_commands[0].attempts == 1
+        assert SlowRetried.started == 1
@@ -0,0 +1,77 @@
+import json
+from io import StringIO
+from os import path
+
+from ccli import CCLI, Command
+from ccli.instrument import InstrumentationHook
+from ccli.profiler import Profiler
+from tests.command_mock import CommandMock
+
+
+class Allocate(Command):
+    key = "allocate"
+
+    def run(self):
+        return [0] * 100000
+
+
+class Idle(Command):
+    key = "idle"
+
+
+class SpanNames(InstrumentationHook):
+    def __init__(self):
+        self.started = []
+        self.finished = []
+
+    def span_started(self, span):
+        self.started.append(span.name)
+
+    def span_finished(self, span):
+        self.finished.append(span.name)
+
+
+class TestProfile(CommandMock):
+    uses_commands = [Allocate, Idle]
+
+    def test_hooks(self):
+        hook = SpanNames()
+        CCLI(cli_args=["ccli", "allocate", "idle"], hooks=[hook])
+        assert hook.started == [
+            "discovery",
+            "tokenize",
+            "parse",
+            "parse",
+            "optimize",
+            "instantiate",
+            "instantiate",
+            "run",
+            "run",
+            "run",
+        ]
+        assert sorted(hook.finished) == sorted(hook.started)
+
+    def test_json_summary(self):
+        stream = StringIO()
+        profiler = Profiler("json", stream=stream)
+        CCLI(cli_args=["ccli", "allocate", "idle"], hooks=[profiler])
+        profiler.report()
+
+        summary = json.loads(stream.getvalue())
+        commands = [record for record in summary if record["category"] == "command"]
+        assert [record["attributes"]["key"] for record in commands] == [
+            "allocate",
+            "idle",
+        ]
+        assert commands[0]["peak_memory"] > 100000 * 8
+        assert commands[0]["peak_memory"] > commands[1]["peak_memory"]
+
+    def test_profile_flag(self, capsys):
+        c = CCLI(cli_args=["ccli", "--cli-profile", "idle"])
+        assert len(c.invoked_commands) == 1
+        assert "run idle" in capsys.readouterr().err
+
+    def test_pstats(self, tmp_path):
+        profiler = Profiler("pstats", stream=StringIO(), pstats_dir=str(tmp_path))
+        CCLI(cli_args=["ccli", "allocate"], hooks=[profiler])
+        assert path.exists(path.join(str(tmp_path), "ccli-0-allocate.pstats"))
@@ -0,0 +1,35 @@
+import sys
+
+from ccli import CCLI, CommandRegistry
+
+MANIFEST = "./tests/lazy_manifest.json"
+
+
+class TestCommandRegistry:
+    def test_only_invoked_commands_are_imported(self):
+        registry = CommandRegistry.from_manifest(MANIFEST)
+        c = CCLI(cli_args=["ccli", "r"], command_registry=registry)
+
+        from tests.lazy_commands import Report
+
+        assert Report.run_count == 1
+        assert c.invoked_commands[0].instance.__class__ is Report
+        assert "tests.unimported_module" not in sys.modules
+
+    def test_descriptions_from_manifest(self):
+        registry = CommandRegistry.from_manifest(MANIFEST)
+        assert "missing" in registry
+        assert registry.description("missing") == "Never imported."
+        assert registry.groups() == {
+            "tests.lazy_commands:Report": ["report", "r"],
+            "tests.unimported_module:Missing": ["missing"],
+        }
+
+    def test_help_text_does_not_import(self):
+        registry = CommandRegistry.from_manifest(MANIFEST)
+        c = CCLI(cli_args=["ccli"], command_registry=registry)
+        assert c._command_descriptions() == [
+            (["report", "r"], "Generate a report."),
+            (["missing"], "Never imported."),
+        ]
+        assert "tests.unimported_module" not in sys.modules
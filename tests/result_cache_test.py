@@ -0,0 +1,97 @@
+import os
+import time
+from argparse import ArgumentParser
+
+import pytest
+
+from ccli import CCLI, Command, ResultCache
+from tests.command_mock import CommandMock
+
+
+class Generate(Command):
+    key = "generate"
+    cacheable = True
+    run_count = 0
+    parser = ArgumentParser()
+    parser.add_argument("schema")
+    parser.add_argument("--prefix", default="")
+
+    def input_files(self):
+        return [self.args.schema]
+
+    def run(self):
+        Generate.run_count += 1
+        with open(self.args.schema, encoding="utf8") as f:
+            return self.args.prefix + f.read()
+
+
+class Upper(Command):
+    key = "upper"
+    cacheable = True
+    run_count = 0
+
+    def run(self):
+        Upper.run_count += 1
+        return self.input.upper()
+
+
+class TestResultCache(CommandMock):
+    uses_commands = [Generate, Upper]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def reset_run_count():
+        Generate.run_count = 0
+        Upper.run_count = 0
+
+    @staticmethod
+    @pytest.fixture
+    def schema(tmp_path):
+        schema = tmp_path / "schema.txt"
+        schema.write_text("table")
+        return str(schema)
+
+    def test_hit_restores_output(self, tmp_path, schema):
+        cache_dir = str(tmp_path / "cache")
+        CCLI(cli_args=["ccli", "generate", schema, "upper"], cache_dir=cache_dir)
+        c = CCLI(cli_args=["ccli", "generate", schema, "upper"], cache_dir=cache_dir)
+
+        assert Generate.run_count == 1
+        assert Upper.run_count == 1
+        assert [cmd.cached for cmd in c.invoked_commands] == [True, True]
+        assert c.invoked_commands[1].output == "TABLE"
+
+    def test_args_and_input_files_change_key(self, tmp_path, schema):
+        cache_dir = str(tmp_path / "cache")
+        CCLI(cli_args=["ccli", "generate", schema], cache_dir=cache_dir)
+        c = CCLI(
+            cli_args=["ccli", "generate", schema, "--prefix", "x"], cache_dir=cache_dir
+        )
+        assert c.invoked_commands[0].output == "xtable"
+
+        with open(schema, "w", encoding="utf8") as f:
+            f.write("view")
+        c = CCLI(cli_args=["ccli", "generate", schema], cache_dir=cache_dir)
+        assert c.invoked_commands[0].output == "view"
+        assert Generate.run_count == 3
+
+    def test_expired_entries(self, tmp_path, schema):
+        cache_dir = tmp_path / "results"
+        result_cache = ResultCache(str(cache_dir), max_age=60)
+        CCLI(cli_args=["ccli", "generate", schema], result_cache=result_cache)
+        (entry,) = os.listdir(str(cache_dir))
+        old = time.time() - 120
+        os.utime(str(cache_dir / entry), (old, old))
+
+        c = CCLI(cli_args=["ccli", "generate", schema], result_cache=result_cache)
+        assert not c.invoked_commands[0].cached
+        assert Generate.run_count == 2
+
+    def test_size_eviction(self, tmp_path):
+        result_cache = ResultCache(str(tmp_path), max_size=1500)
+        for i in range(3):
+            result_cache.put("key-%d" % i, "x" * 1000)
+            os.utime(str(tmp_path / ("key-%d.pickle" % i)), (i, time.time()))
+
+        assert result_cache.get("key-0") == (False, None)
+        assert result_cache.get("key-2") == (True, "x" * 1000)
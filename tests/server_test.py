@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+from threading import Thread
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.server import CCLIServer
+from tests.command_mock import CommandMock
+
+
+class Where(Command):
+    key = "where"
+
+    def run(self):
+        os.write(1, ("%s %s\n" % (os.getcwd(), os.environ["CCLI_TEST"])).encode())
+
+
+class Exit(Command):
+    key = "exit"
+
+    def run(self):
+        sys.exit(3)
+
+
+class TestServer(CommandMock):
+    uses_commands = [Where, Exit]
+
+    @staticmethod
+    @pytest.fixture
+    def socket_path(tmp_path):
+        server = CCLIServer(CCLI(auto_run=False), str(tmp_path / "ccli.sock"))
+        thread = Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server.socket_path
+        server.shutdown()
+        server.server_close()
+
+    @staticmethod
+    def run_client(socket_path, args, cwd):
+        env = dict(os.environ, CCLI_TEST="from client")
+        client = os.path.join(os.path.dirname(__file__), "..", "ccli", "client.py")
+        return subprocess.run(
+            [sys.executable, "-S", client, socket_path] + args,
+            capture_output=True,
+            cwd=cwd,
+            env=env,
+        )
+
+    def test_forwards_cwd_env_and_stdout(self, socket_path, tmp_path):
+        process = self.run_client(socket_path, ["where"], str(tmp_path))
+        assert process.returncode == 0
+        assert process.stdout.decode() == "%s from client\n" % tmp_path
+
+    def test_exit_code(self, socket_path, tmp_path):
+        assert self.run_client(socket_path, ["exit"], str(tmp_path)).returncode == 3
+
+    def test_server_not_running(self, tmp_path):
+        process = self.run_client(str(tmp_path / "missing.sock"), [], str(tmp_path))
+        assert process.returncode == 2
+        assert b"Could not reach the CCLI server" in process.stderr
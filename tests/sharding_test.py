@@ -0,0 +1,94 @@
+import os
+import time
+from argparse import Namespace
+
+import pytest
+
+from ccli import CCLI, Argument, Command
+from ccli.isolation import shard_arguments
+from tests.command_mock import CommandMock
+
+
+class Checksum(Command):
+    key = "checksum"
+    arguments = (Argument("files", nargs="+"), Argument("--scale", type=int, default=1))
+    shard_argument = "files"
+    shard_size = 2
+
+    def run(self):
+        return os.getpid(), [len(name) * self.args.scale for name in self.args.files]
+
+
+class Slow(Command):
+    key = "slow"
+    arguments = (Argument("delays", type=float, nargs="+"),)
+    shard_argument = "delays"
+    shard_size = 1
+    shard_ordered = False
+
+    def run(self):
+        time.sleep(self.args.delays[0])
+        return self.args.delays[0]
+
+
+class Parse(Command):
+    key = "parse"
+    arguments = (Argument("values", nargs="+"),)
+    shard_argument = "values"
+    shard_size = 1
+
+    def run(self):
+        return int(self.args.values[0])
+
+
+class TestSharding(CommandMock):
+    uses_commands = [Checksum, Slow, Parse]
+
+    def test_shards_run_in_workers(self):
+        c = CCLI(
+            cli_args=[
+                "ccli",
+                "checksum",
+                "a",
+                "bb",
+                "ccc",
+                "dddd",
+                "e",
+                "--scale",
+                "2",
+            ],
+            max_workers=2,
+        )
+        output = c.invoked_commands[0].output
+        assert [sizes for _, sizes in output] == [[2, 4], [6, 8], [2]]
+        assert os.getpid() not in {pid for pid, _ in output}
+
+    def test_unordered_outputs(self):
+        c = CCLI(cli_args=["ccli", "slow", "0.3", "0"], max_workers=2)
+        assert c.invoked_commands[0].output == [0, 0.3]
+
+    def test_shard_errors_are_gathered(self):
+        c = CCLI(auto_run=False, max_workers=2)
+        result = c.dispatch(["parse", "1", "x", "3", "y"])
+        c.close()
+        cmd = result.invoked_commands[0]
+        assert isinstance(result.error, ValueError)
+        assert "'x'" in str(result.error)
+        assert sorted(cmd.shard_errors) == [1, 3]
+        assert cmd.output is None
+
+    def test_split_evenly_over_workers(self):
+        class Evenly(Command):
+            key = "evenly"
+            shard_argument = "files"
+
+        args = Namespace(files=list(range(10)), flag=True)
+        shards = shard_arguments(Evenly, args, 4)
+        assert [shard.files for shard in shards] == [
+            [0, 1, 2],
+            [3, 4, 5],
+            [6, 7, 8],
+            [9],
+        ]
+        assert all(shard.flag for shard in shards)
+        assert shard_arguments(Evenly, Namespace(files=[]), 4) == [Namespace(files=[])]
@@ -0,0 +1,64 @@
+import io
+from argparse import ArgumentParser
+
+from ccli import CCLI, Command
+from ccli.tokenizer import read_arguments
+from tests.command_mock import CommandMock
+
+
+class Seed(Command):
+    key = "seed"
+    chunk_argument = "files"
+    chunk_size = 2
+    parser = ArgumentParser()
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--table")
+
+    def run(self):
+        return (self.input or []) + [self.args.files]
+
+
+class Start(Command):
+    key = "start"
+
+
+class TestTokenizer(CommandMock):
+    uses_commands = [Seed, Start]
+
+    def test_chunked_invocations(self):
+        c = CCLI(cli_args=["ccli", "seed", "a", "b", "c", "--table", "t", "start"])
+        seeds = [cmd for cmd in c.invoked_commands if cmd.key == "seed"]
+        assert [cmd.args.files for cmd in seeds] == [["a", "b"], ["c"]]
+        assert {cmd.args.table for cmd in seeds} == {"t"}
+        assert seeds[-1].output == [["a", "b"], ["c"]]
+        assert c.invoked_commands[-1].key == "start"
+
+    def test_argfile(self, tmp_path):
+        argfile = tmp_path / "files.txt"
+        argfile.write_text("a\n\nb\r\nstart\n")
+        c = CCLI(cli_args=["ccli", "seed", "@" + str(argfile)], argfile_prefix="@")
+        assert [cmd.key for cmd in c.invoked_commands] == ["seed", "start"]
+        assert c.invoked_commands[0].args.files == ["a", "b"]
+
+    def test_argfile_from_stdin(self, monkeypatch):
+        monkeypatch.setattr("sys.stdin", io.StringIO("a\0b c\0\0"))
+        c = CCLI(cli_args=["ccli", "seed", "@-"], argfile_prefix="@")
+        assert [cmd.args.files for cmd in c.invoked_commands] == [["a", "b c"], [""]]
+
+    def test_single_mode_reads_remaining_tokens(self):
+        c = CCLI(
+            cli_args=["ccli", "seed", "a", "start", "b"],
+            enable_chaining=False,
+        )
+        assert [cmd.args.files for cmd in c.invoked_commands] == [
+            ["a", "start"],
+            ["b"],
+        ]
+
+    def test_read_arguments_across_blocks(self):
+        stream = io.StringIO("first\nsecond\nthird")
+        assert list(read_arguments(stream, block_size=4)) == [
+            "first",
+            "second",
+            "third",
+        ]
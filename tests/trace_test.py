@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.trace import FileExporter, SpanExporter, Tracer
+from tests.command_mock import CommandMock
+
+
+class Fetch(Command):
+    key = "fetch"
+    concurrent = True
+
+
+class Compile(Command):
+    key = "compile"
+    concurrent = True
+
+
+class Broken(Command):
+    key = "broken"
+
+    def run(self):
+        raise RuntimeError("broken")
+
+
+class TestTrace(CommandMock):
+    uses_commands = [Fetch, Compile, Broken]
+
+    def test_chrome_trace(self, tmp_path):
+        trace_path = str(tmp_path / "trace.json")
+        CCLI(cli_args=["ccli", "fetch", "compile", "--cli-trace=" + trace_path])
+
+        with open(trace_path, encoding="utf8") as f:
+            events = json.load(f)["traceEvents"]
+        names = [event["name"] for event in events]
+        assert names[:3] == ["discovery", "tokenize", "parse fetch"]
+        assert "run compile" in names
+        assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+    def test_otlp_parents_across_threads(self, tmp_path):
+        trace_path = str(tmp_path / "trace.json")
+        c = CCLI(
+            cli_args=[
+                "ccli",
+                "fetch",
+                "compile",
+                "--cli-trace=" + trace_path,
+                "--cli-trace-format=otlp",
+            ],
+            concurrent=True,
+        )
+        assert len(c.invoked_commands) == 2
+
+        with open(trace_path, encoding="utf8") as f:
+            trace = json.load(f)
+        spans = trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        by_name = {span["name"]: span for span in spans}
+        run_phase = by_name["run"]
+        assert by_name["run fetch"]["parentSpanId"] == run_phase["spanId"]
+        assert by_name["run compile"]["parentSpanId"] == run_phase["spanId"]
+        assert len({span["traceId"] for span in spans}) == 1
+
+    def test_failed_command(self):
+        exported = []
+
+        class ListExporter(SpanExporter):
+            def export(self, spans):
+                exported.extend(spans)
+
+        tracer = Tracer([ListExporter()])
+        result = CCLI(auto_run=False, hooks=[tracer]).dispatch(["broken"])
+        tracer.report()
+
+        assert not result.ok
+        (run_span,) = [
+            span for span in exported if span.name == "run" and span.parent_id
+        ]
+        assert isinstance(run_span.error, RuntimeError)
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            FileExporter("trace.json", "svg")
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from ccli import CCLI, Command
+from ccli.watch import InotifyWatcher, PollingWatcher
+from tests.command_mock import CommandMock
+
+runs = []
+
+
+class Schema(Command):
+    key = "schema"
+
+    def input_files(self):
+        return ["schema.sql"]
+
+    def run(self):
+        runs.append("schema")
+        with open("schema.sql", encoding="utf8") as f:
+            return f.read()
+
+
+class Seed(Command):
+    key = "seed"
+
+    def input_files(self):
+        return ["seed.sql"]
+
+    def run(self):
+        runs.append("seed")
+        return self.input
+
+
+class Check(Command):
+    key = "check"
+
+    def run(self):
+        runs.append("check")
+        if "broken" in self.input:
+            raise ValueError("broken schema")
+
+
+class FakeWatcher:
+    """Returns the next scripted change, then stops the watch loop."""
+
+    changes = []
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def wait(self, debounce):
+        if not FakeWatcher.changes:
+            raise KeyboardInterrupt
+        return FakeWatcher.changes.pop(0)
+
+    def close(self):
+        pass
+
+
+class TestWatch(CommandMock):
+    uses_commands = [Schema, Seed, Check]
+
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def in_tmp_path(tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "schema.sql").write_text("create table")
+        (tmp_path / "seed.sql").write_text("insert")
+        monkeypatch.setattr("ccli.watch.create_watcher", FakeWatcher)
+        del runs[:]
+
+    def test_reruns_changed_and_downstream_commands(self, tmp_path, capsys):
+        FakeWatcher.changes = [
+            {str(tmp_path / "seed.sql")},
+            {str(tmp_path / "schema.sql")},
+        ]
+        CCLI(cli_args=["ccli", "schema", "seed", "check", "--cli-watch"])
+        assert runs == [
+            "schema",
+            "seed",
+            "check",
+            "seed",
+            "check",
+            "schema",
+            "seed",
+            "check",
+        ]
+        assert "Watching 2 files" in capsys.readouterr().err
+
+    def test_failed_run_keeps_watching(self, tmp_path, capsys):
+        (tmp_path / "schema.sql").write_text("broken")
+        FakeWatcher.changes = [{str(tmp_path / "seed.sql")}]
+        c = CCLI(cli_args=["ccli", "schema", "seed", "check", "--cli-watch"])
+        assert runs == ["schema", "seed", "check", "seed", "check"]
+        assert c.invoked_commands[0].resumed
+        assert "ValueError: broken schema" in capsys.readouterr().err
+
+
+class Build(Command):
+    key = "build"
+    runs = 0
+
+    def input_files(self):
+        return ["in.txt"]
+
+    def run(self):
+        Build.runs += 1
+        if Build.runs > 1:
+            raise KeyboardInterrupt
+        # The file is edited while the chain runs.
+        time.sleep(0.5)
+
+
+class TestWatchRealFiles(CommandMock):
+    uses_commands = [Build]
+
+    def test_change_during_run_triggers_rerun(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "in.txt").write_text("a")
+        Build.runs = 0
+
+        def edit():
+            time.sleep(0.2)
+            (tmp_path / "in.txt").write_text("bb")
+            # Ends the watch loop if the first edit was missed.
+            time.sleep(3)
+            (tmp_path / "in.txt").write_text("ccc")
+
+        thread = threading.Thread(target=edit, daemon=True)
+        thread.start()
+        start = time.perf_counter()
+        CCLI(cli_args=["ccli", "build", "--cli-watch=0.05"])
+        assert Build.runs == 2
+        assert time.perf_counter() - start < 2
+
+
+class TestWatcher:
+    @pytest.mark.parametrize("watcher_class", [InotifyWatcher, PollingWatcher])
+    def test_detects_changes(self, tmp_path, watcher_class):
+        watched = tmp_path / "watched.txt"
+        watched.write_text("a")
+        watcher = watcher_class([str(watched), str(tmp_path / "new.txt")])
+
+        def edit():
+            time.sleep(0.05)
+            (tmp_path / "other.txt").write_text("ignored")
+            watched.write_text("bb")
+            (tmp_path / "new.txt").write_text("c")
+
+        thread = threading.Thread(target=edit)
+        thread.start()
+        try:
+            changed = watcher.wait(debounce=0.3)
+        finally:
+            thread.join()
+            watcher.close()
+        assert changed == {str(watched), str(tmp_path / "new.txt")}